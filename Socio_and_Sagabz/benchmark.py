@@ -0,0 +1,177 @@
+#!/usr/bin/python
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+
+from run_sagabz_socio import RunSagzab, RunSocio
+from socio_to_classification import CATEGORIES
+from synthetic_data import generate_cohort
+from profiling import peak_rss_mb
+
+DEFAULT_FORMAT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Formats",
+                                   "socio_format_for_classification.docx")
+# the stages of SocioAndSagabz.run, in their order
+STAGES = ["preprocess_and_combine", "create_individual_excel", "create_statistics", "save_sigmas",
+          "create_word_files"]
+
+
+def stub_category(text):
+    # the same text always gets the same category
+    return CATEGORIES[zlib.crc32(str(text).encode("utf-8")) % len(CATEGORIES)]
+
+
+class StubBackend():
+    """
+    Answers the prompts of classification_model instantly, without a model:
+    the translation is the text itself and the category is chosen by the hash of the text.
+    """
+    def __call__(self, prompt: str):
+        if "User prompts (JSON): " in prompt:
+            items = json.loads(prompt.split("User prompts (JSON): ", 1)[1])
+            return json.dumps([{"id": item["id"], "translation": item["text"], "category": stub_category(item["text"])}
+                               for item in items], ensure_ascii=False)
+
+        text = prompt.split('User prompt: "', 1)[-1].rstrip('"')
+        if "JSON object" in prompt:
+            return json.dumps({"translation": text, "category": stub_category(text)}, ensure_ascii=False)
+        if "translat" in prompt.split("\n", 1)[0]:
+            return text
+        return stub_category(text)
+
+
+def benchmark_run_class(run_class):
+    """
+    :return: a subclass of the run class, with the classification answered by StubBackend
+    """
+    class BenchmarkRun(run_class):
+        def create_classification_model(self):
+            classification_model = super().create_classification_model()
+            classification_model.backend = StubBackend()
+            return classification_model
+
+    return BenchmarkRun
+
+
+def run_benchmark(num_cadets, num_raters=20, is_socio=True, comment_words=(3, 15), work_dir=None,
+                  format_path=DEFAULT_FORMAT_PATH, run_kwargs=None):
+    """
+    Generate a synthetic cohort and time every stage of the run on it (with the classification stubbed out).
+    :param work_dir: directory of the cohort and the outputs, a temporary directory (deleted after) when None
+    :param run_kwargs: more arguments of the run object (workers, cache_histograms...)
+    :return: dict of the configuration, the seconds of every stage, the total seconds and the peak memory of the
+             process and of its --workers processes (the peaks are of the whole process, see run_benchmark_in_process)
+    """
+    temp_dir = None
+    if work_dir is None:
+        temp_dir = work_dir = tempfile.mkdtemp(prefix="socio_benchmark_")
+
+    try:
+        inputs_path = os.path.join(work_dir, "inputs")
+        outputs_path = os.path.join(work_dir, "outputs")
+        shutil.rmtree(inputs_path, ignore_errors=True)
+        shutil.rmtree(outputs_path, ignore_errors=True)
+        generate_cohort(inputs_path, num_cadets=num_cadets, num_raters=num_raters, is_socio=is_socio,
+                        comment_words=comment_words)
+
+        run_kwargs = dict(run_kwargs or {})
+        # every run starts cold, nothing is reused from a previous run
+        run_kwargs.setdefault("use_parse_cache", False)
+        run_kwargs.setdefault("use_classification_cache", False)
+        # the stub answers instantly, the rate limit would only add waiting
+        run_kwargs.setdefault("llm_requests_per_minute", 10 ** 9)
+        run_class = benchmark_run_class(RunSocio if is_socio else RunSagzab)
+        run_obj = run_class(inputs_path, outputs_path, format_path, **run_kwargs)
+
+        stages = {}
+        start = perf_counter()
+        run_obj.ensure_dir(run_obj.outputs_path)
+        for stage in STAGES:
+            stage_start = perf_counter()
+            getattr(run_obj, stage)()
+            stages[stage] = perf_counter() - stage_start
+        total = perf_counter() - start
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return {"config": {"cadets": num_cadets, "raters": num_raters, "is_socio": is_socio,
+                       "comment_words": list(comment_words), "run_kwargs": run_kwargs},
+            "stages": stages,
+            "total": total,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_workers_rss_mb": peak_rss_mb(children=True)}
+
+
+def run_benchmark_in_process(num_cadets, **kwargs):
+    """
+    run_benchmark in a new process, so the peak memory is of this cohort only and not of the cohorts benchmarked
+    before it (the peak memory of a process only grows).
+    :param kwargs: the arguments of run_benchmark
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(run_benchmark, num_cadets, **kwargs).result()
+
+
+def compare_to_baseline(result, baseline):
+    """
+    Print the seconds of every stage next to the baseline of the same number of cadets.
+    """
+    print(f"{'stage':<25}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    rows = [(stage, baseline["stages"].get(stage), result["stages"][stage]) for stage in result["stages"]]
+    rows.append(("total", baseline.get("total"), result["total"]))
+    rows.append(("peak_rss_mb", baseline.get("peak_rss_mb"), result["peak_rss_mb"]))
+    rows.append(("peak_workers_rss_mb", baseline.get("peak_workers_rss_mb"), result["peak_workers_rss_mb"]))
+    for name, old, new in rows:
+        if old is None or new is None:
+            print(f"{name:<25}{str(old):>12}{str(new):>12}")
+            continue
+        ratio = new / old if old > 0 else float("inf")
+        print(f"{name:<25}{old:>12.2f}{new:>12.2f}{ratio:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time every stage of the pipeline on synthetic cohorts,\
+                                                  with the classification stubbed out")
+    parser.add_argument('--cadets', type=int, nargs='+', default=[50], help="numbers of cadets to benchmark.")
+    parser.add_argument('--raters', type=int, default=20, help="number of raters (excel files).")
+    parser.add_argument('--sagabz', action='store_true', default=False, help="benchmark the sagabz run.")
+    parser.add_argument('--comment-words', type=int, nargs=2, default=[3, 15],
+                        help="minimal and maximal number of words of a comment.")
+    parser.add_argument('--workers', type=int, default=1, help="--workers of the run.")
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help="directory of the cohorts and the outputs (kept), a temporary directory when not given.")
+    parser.add_argument('--format-path', type=str, default=DEFAULT_FORMAT_PATH, help="path for the format file.")
+    parser.add_argument('--output', type=str, default=None, help="save the results to this json file.")
+    parser.add_argument('--baseline', type=str, default=None,
+                        help="json of a previous --output, the results are compared to it.")
+    args = parser.parse_args()
+
+    baselines = {}
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baselines = {result["config"]["cadets"]: result for result in json.load(f)}
+
+    results = []
+    for num_cadets in args.cadets:
+        print("---------------------------------")
+        print(f"benchmark of {num_cadets} cadets")
+        work_dir = os.path.join(args.work_dir, f"{num_cadets}_cadets") if args.work_dir is not None else None
+        # every size is run in a new process, for its own peak memory
+        result = run_benchmark_in_process(num_cadets, num_raters=args.raters, is_socio=not args.sagabz,
+                               comment_words=tuple(args.comment_words), work_dir=work_dir,
+                               format_path=args.format_path, run_kwargs={"workers": args.workers})
+        results.append(result)
+
+        print(json.dumps(result, indent=1))
+        if num_cadets in baselines:
+            compare_to_baseline(result, baselines[num_cadets])
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
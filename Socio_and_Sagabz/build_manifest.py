@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+# bump when the outputs of a stage change for the same inputs, so old outputs are rebuilt
+MANIFEST_VERSION = 1
+
+
+def file_hash(path):
+    """
+    :return: sha256 of the file content, None if there is no such file
+    """
+    if path is None or not os.path.isfile(path):
+        return None
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def frame_hash(df):
+    """
+    :return: hash of the values, the columns and the dtypes of the dataframe (not of its index)
+    """
+    if df is None:
+        return None
+    if not isinstance(df, pd.DataFrame):
+        df = pd.DataFrame(df)
+    sha = hashlib.sha256()
+    sha.update(json.dumps([str(col) for col in df.columns], ensure_ascii=False).encode("utf-8"))
+    sha.update(json.dumps([str(dtype) for dtype in df.dtypes]).encode("utf-8"))
+    # object columns with mixed values are hashed by their string
+    sha.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    return sha.hexdigest()
+
+
+def value_hash(value):
+    """
+    :return: hash of a json-able value (anything else is hashed by its string)
+    """
+    return hashlib.sha256(json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+                          .encode("utf-8")).hexdigest()
+
+
+class BuildManifest():
+    def __init__(self, path: str):
+        """
+        The hashes of the inputs of every output of the previous run, saved as json.
+        An output is rebuilt only when the hash of its inputs changed, or when the output file is missing.
+        :param path: path of the manifest json, created by save
+        """
+        self.path = path
+        # the streaming mode records the excels in a background thread
+        self.lock = threading.Lock()
+        self.inputs = {}
+        self.stages = {}
+
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                if manifest.get("version") == MANIFEST_VERSION:
+                    self.inputs = manifest.get("inputs", {})
+                    self.stages = manifest.get("stages", {})
+            except ValueError:
+                print(f"the build manifest {path} is corrupted, building everything")
+
+    def update_inputs(self, name: str, hashes):
+        """
+        Record the hashes of an input of the run (only for reporting what changed).
+        :return: the names of the entries that changed since the previous run
+        """
+        old = self.inputs.get(name)
+        self.inputs[name] = hashes
+        if isinstance(hashes, dict):
+            old = old if isinstance(old, dict) else {}
+            return sorted(set(key for key in set(old) | set(hashes) if old.get(key) != hashes.get(key)))
+        return [name] if old != hashes else []
+
+    def is_fresh(self, stage: str, name: str, key: str, output_path: str = None):
+        """
+        :param key: hash of all of the inputs of the output
+        :return: True if the output was built from the same inputs and still exists
+        """
+        if self.stages.get(stage, {}).get(name) != key:
+            return False
+        return output_path is None or os.path.isfile(output_path)
+
+    def record(self, stage: str, name: str, key: str):
+        with self.lock:
+            self.stages.setdefault(stage, {})[name] = key
+
+    def save(self):
+        # written to a temporary file first, so a stopped run does not leave a broken manifest
+        tmp_path = self.path + ".tmp"
+        with self.lock, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "inputs": self.inputs, "stages": self.stages}, f,
+                      ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
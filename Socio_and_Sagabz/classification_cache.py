@@ -0,0 +1,57 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+
+
+def normalize_text(text):
+    # the same comment with different spaces / unicode forms is the same comment
+    text = unicodedata.normalize("NFC", str(text))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class ClassificationCache():
+    def __init__(self, path: str):
+        """
+        Persistent cache of the model answers (translations, categories), in a sqlite file.
+        The answers are keyed by the hash of the normalized text and the version of the prompt and the model,
+        so changing the prompt or the model does not reuse old answers.
+        :param path: path of the sqlite file, created if it does not exist
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT NOT NULL)")
+
+    def key(self, version: str, text):
+        return hashlib.sha256(f"{version}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, version: str, texts):
+        """
+        :return: dict text -> cached answer, only of the texts that are in the cache
+        """
+        keys = {self.key(version, text): text for text in texts}
+        answers = {}
+        key_list = list(keys.keys())
+        with self.lock:
+            # sqlite limits the number of parameters of a query
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                rows = self.connection.execute(
+                    f"SELECT key, answer FROM answers WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                for key, answer in rows:
+                    answers[keys[key]] = answer
+        return answers
+
+    def put_many(self, version: str, answers: dict):
+        """
+        :param answers: dict text -> answer
+        """
+        rows = [(self.key(version, text), answer) for text, answer in answers.items() if answer is not None]
+        with self.lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO answers (key, answer) VALUES (?, ?)", rows)
+
+    def close(self):
+        self.connection.close()
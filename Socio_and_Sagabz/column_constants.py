@@ -5,5 +5,4 @@ MASHOV_SAGZAB = ['name', 'personal example', 'involved', 'high standards', 'impr
                  'points to conserve', 'points to improve']
 SOCIOMETRY = ["name", "knowing", "intrapersonal", "functioning in society", "leadership", "conduct", "academy",
               "applicative knowledge", "security", "responsibility", "excellence", "integrity", "daring", "mission",
-              "courtesy", "general", "points to conserve", "points to improve"]
-SIGMAS = {}
\ No newline at end of file
+              "courtesy", "general", "points to conserve", "points to improve"]
\ No newline at end of file
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
+import hashlib
 
 import matplotlib.pyplot as plt
 import pandas as pd
@@ -10,13 +12,18 @@ from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from matplotlib.figure import Figure
 from tqdm import tqdm
 import os
+import sys
 from docx.oxml.ns import qn
-from column_constants import SIGMAS
+from statistics_socio import sigma_thresholds
 from docxtpl import DocxTemplate
 from docx.oxml import OxmlElement
+# the modules shared with the other packages are in shared/ in the root of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.image_embedding import add_picture, fix_picture_ids
+from build_manifest import file_hash, frame_hash, value_hash
+import profiling
 
 ADD_IN_END_OF_SENTENCE: str = "."
-IS_SOCIO = True
 
 def text_to_rgba(s, *, dpi, **kwargs):
     # To convert a text string to an image, we can:
@@ -73,10 +80,41 @@ def ensure_ends_with(sentence, add_on):
     return sentence
 
 
+class StatsLookup:
+    """
+    The statistics the word files need, indexed once per run:
+    (name, category) -> mean, std, old mean and N, and for every category the means of everyone and their mean.
+    """
+    def __init__(self, stats_df: pd.DataFrame, old_stats_df: pd.DataFrame = None):
+        keys = list(zip(stats_df["name"], stats_df["category"]))
+        self.mean = dict(zip(keys, stats_df["mean"]))
+        self.std = dict(zip(keys, stats_df["std"]))
+        # number of non 0 answers for each name, for each category (counted by Statistics.run)
+        self.N = dict(zip(keys, stats_df["N"]))
+
+        by_category = stats_df.groupby("category", sort=False)["mean"]
+        self.all_avgs = {category: means.to_numpy() for category, means in by_category}
+        self.avg_total = by_category.mean().to_dict()  # mean of all the people
+
+        self.old_names = None
+        self.old_mean = {}
+        if old_stats_df is not None:
+            self.old_names = set(old_stats_df["name"])
+            old_stats_df = old_stats_df.drop_duplicates(subset=["name", "category"], keep="first")
+            self.old_mean = dict(zip(zip(old_stats_df["name"], old_stats_df["category"]), old_stats_df["mean"]))
+
+
 class Docx_helper(ABC):
-    def __init__(self, file_format_path, word_output_dir):
+    def __init__(self, file_format_path, word_output_dir, cache_histograms=True):
         self.file_format_path = file_format_path
         self.word_output_dir = word_output_dir
+        # when True, the histogram of all the means is drawn once per category and every cadet is only drawn over it
+        self.cache_histograms = cache_histograms
+        self.histogram_backgrounds = {}
+        # rounded mean -> png bytes of its sentence, there are only 6 of them
+        self.text_figures = {}
+        # category -> (small, big) sigma thresholds, set by prepare_word_creation (and copied to the workers with self)
+        self.sigmas = {}
 
     @abstractmethod
     def is_values(self, category: str) -> bool:
@@ -88,11 +126,11 @@ class Docx_helper(ABC):
 
 
     def my_hash(self, s):
-        # convert the string number in a deterministic way
-        return abs(hash(s)).__str__()
+        # convert the string number in a deterministic way (the builtin hash is different in every process)
+        return str(int(hashlib.sha256(str(s).encode("utf-8")).hexdigest()[:16], 16))
 
     def sigma_text(self, sigma, category):
-        values_small_threshold, values_big_threshold = SIGMAS[category]
+        values_small_threshold, values_big_threshold = self.sigmas[category]
 
         small, big = False, False
         if sigma > values_big_threshold:
@@ -108,50 +146,110 @@ class Docx_helper(ABC):
             ret_val = "sigma value is average"
         return ret_val
 
-    def create_histogram(self, all_avgs, avg_total, avg_personal, std_personal, category,
-                         old_average=-1, N=-1):
-        fig = plt.figure()
-        ax = plt.gca()
-
-        is_values = self.is_values(category)
-
-        if is_values:
+    def histogram_bins(self, category):
+        if self.is_values(category):
             bins = np.arange(-0.125, 3.375, 0.25)
             xticks = np.arange(0, 3.25, 0.25)
         else:
             bins = np.arange(-0.25, 6.75, 0.5)
             xticks = np.arange(0, 6.5, 0.5)
+        return bins, xticks
+
+    def create_histogram(self, all_avgs, avg_total, avg_personal, std_personal, category,
+                         old_average=-1, N=-1):
+        if self.cache_histograms:
+            return self.create_cached_histogram(all_avgs, avg_total, avg_personal, std_personal, category,
+                                                old_average=old_average, N=N)
+
+        fig = plt.figure()
+        ax = plt.gca()
+
+        bins, xticks = self.histogram_bins(category)
 
         plt.xticks(xticks, fontsize=16)
         plt.hist(x=all_avgs, bins=bins, rwidth=0.9)
         plt.yticks(fontsize=16)
 
+        self.draw_personal_data(ax, avg_total, avg_personal, std_personal, category, old_average=old_average, N=N)
+
+        fig.set_size_inches(10, 5)
+        plt.close(fig)
+        # fig.show()
+        # plt.show()
+        return fig
+
+    def create_cached_histogram(self, all_avgs, avg_total, avg_personal, std_personal, category,
+                                old_average=-1, N=-1):
+        """
+        Same histogram as create_histogram, but the histogram of all the means is drawn only once per category.
+        The personal data is drawn over it, the figure is rendered and the personal data is removed again.
+        :return: the histogram as png bytes
+        """
+        if category not in self.histogram_backgrounds:
+            fig = Figure(figsize=(10, 5))
+            ax = fig.gca()
+
+            bins, xticks = self.histogram_bins(category)
+
+            ax.set_xticks(xticks)
+            for label in ax.get_xticklabels():
+                label.set_fontsize(16)
+            ax.hist(x=all_avgs, bins=bins, rwidth=0.9)
+            for label in ax.get_yticklabels():
+                label.set_fontsize(16)
+            self.histogram_backgrounds[category] = (fig, ax)
+
+        fig, ax = self.histogram_backgrounds[category]
+        artists = self.draw_personal_data(ax, avg_total, avg_personal, std_personal, category,
+                                          old_average=old_average, N=N)
+
+        with BytesIO() as buf:
+            fig.savefig(buf, format="png")
+            png = buf.getvalue()
+
+        # clean the personal data for the next cadet, and let the limits fit only the histogram again
+        for artist in artists:
+            artist.remove()
+        ax.relim()
+        ax.autoscale_view()
+        return png
+
+    def draw_personal_data(self, ax, avg_total, avg_personal, std_personal, category, old_average=-1, N=-1):
+        """
+        Draw the data of the person over the histogram of everyone.
+        :return: list of the added artists
+        """
+        artists = []
+
         # plot the average value of the specific person
-        plt.axvline(avg_personal, color='red')
+        artists.append(ax.axvline(avg_personal, color='red'))
 
         # plot the average value of person form last year
         if old_average != -1:
-            plt.axvline(old_average, color='green', linestyle="--")
-            plt.text(0.01, 0.7, s="Red line - new result\nDashed line - last semester", fontsize=12, color='black',
-                     transform=ax.transAxes)
+            artists.append(ax.axvline(old_average, color='green', linestyle="--"))
+            artists.append(ax.text(0.01, 0.7, s="Red line - new result\nDashed line - last semester", fontsize=12,
+                                   color='black', transform=ax.transAxes))
 
         # text of number of comments for this category (N)
         if N != -1:
-            plt.text(0.01, 0.6, s=f"N (none zero) ={N}", fontsize=16, color='blue', transform=ax.transAxes)
+            artists.append(ax.text(0.01, 0.6, s=f"N (none zero) ={N}", fontsize=16, color='blue',
+                                   transform=ax.transAxes))
 
         # plot the std of the specific person
         # the name column is the index, so we need the i'th column
-        plt.hlines(y=sum(ax.get_ylim()) / 2, xmin=avg_personal - std_personal,
-                   xmax=avg_personal + std_personal, color='red')
+        artists.append(ax.hlines(y=sum(ax.get_ylim()) / 2, xmin=avg_personal - std_personal,
+                                 xmax=avg_personal + std_personal, color='red'))
         # plt.text(0.01, 0.93, transform=ax.transAxes,
         #          s=r'$\sigma$' + f'={std_personal}\n{self.sigma_text(std_personal, is_values)}',
         #          fontsize=16, color='red')
-        plt.text(0.01, 0.93, transform=ax.transAxes, s=r'$\sigma$' + f"={std_personal}", fontsize=16, color='red')
-        plt.text(0.01, 0.89, s=self.sigma_text(std_personal, category), fontsize=16, color='red',
-                 transform=ax.transAxes)
+        artists.append(ax.text(0.01, 0.93, transform=ax.transAxes, s=r'$\sigma$' + f"={std_personal}", fontsize=16,
+                               color='red'))
+        artists.append(ax.text(0.01, 0.89, s=self.sigma_text(std_personal, category), fontsize=16, color='red',
+                               transform=ax.transAxes))
 
-        plt.axvline(avg_total, color='black')
+        artists.append(ax.axvline(avg_total, color='black'))
         secondary_ax = ax.secondary_xaxis("top")
+        artists.append(secondary_ax)
         # plotting the value of the axvline on the histogram
         if abs(avg_personal - avg_total) < 0.2:
             diff = (0.2 - abs(avg_personal - avg_total)) / 2
@@ -171,13 +269,20 @@ class Docx_helper(ABC):
         for label in secondary_ax.get_xticklabels():
             label.set_fontsize(16)
 
-        fig.set_size_inches(10, 5)
-        plt.close(fig)
-        # fig.show()
-        # plt.show()
-        return fig
+        return artists
 
     def insert_classifications(self, classification_df, format_file_name):
+        # render the classifications into an already saved word file
+        doc = DocxTemplate(template_file=format_file_name)
+        doc.render(context=self.classifications_context(classification_df))
+        doc.save(format_file_name)
+
+    def classifications_context(self, classification_df):
+        """
+        Build the jinja context of the classification bullets of the format file.
+        :param classification_df: the Classification sheet of the person
+        :return: the context dict
+        """
         conserve_names = [("Interpersonal Skills", "יכולות בין-אישיות"), \
                           ("Intrapersonal Skills", "יכולות תוך-אישיות"), \
                           ("Professionalism", "מקצועיות"), \
@@ -193,7 +298,6 @@ class Docx_helper(ABC):
                          ("Other2", "אחר")]
 
         rtl_marks = "\u200F"
-        doc = DocxTemplate(template_file=format_file_name)
         context = {'conserve_classifications': [], 'improve_classifications': []}
 
         for column, word_name in conserve_names:
@@ -230,19 +334,25 @@ class Docx_helper(ABC):
 
                 context["improve_classifications"].append(class_dict)
 
-        doc.render(context=context)
-        doc.save(format_file_name)
+        return context
 
-    def create_word_file(self, hists, classification_df, person_name, n=None, names_to_hashes=False):
+    def word_file_path(self, person_name, n=None, names_to_hashes=False):
         if names_to_hashes:
-            with open("names_to_hashes.txt", "a", encoding="utf-8") as f:
-                f.write(f"{person_name} => {self.my_hash(person_name)}\n")
             title_to_save = f"{self.my_hash(person_name)} (N={n})".replace('"', '').replace("'", '') + ".docx"
         else:
             title_to_save = f"{person_name} (N={n})".replace('"', '').replace("'", '') + ".docx"
-        path_to_save = os.path.join(self.word_output_dir, title_to_save)
+        return os.path.join(self.word_output_dir, title_to_save)
+
+    def create_word_file(self, hists, classification_df, person_name, n=None, names_to_hashes=False, is_socio=True):
+        path_to_save = self.word_file_path(person_name, n=n, names_to_hashes=names_to_hashes)
 
-        doc = Document(self.file_format_path)
+        render_classifications = is_socio and classification_df is not None
+        if render_classifications:
+            # the classifications are rendered into the same document, so it is loaded and saved only once
+            template = DocxTemplate(template_file=self.file_format_path)
+            doc = template.get_docx()
+        else:
+            doc = Document(self.file_format_path)
 
         title = doc.paragraphs[0]
         if names_to_hashes:
@@ -254,37 +364,17 @@ class Docx_helper(ABC):
         title.runs[0] = "David"
         title.runs[0].underline = True
 
-        # add the histograms to the table
+        # add the histograms to the table, as in-memory pictures
         for i in range(len(hists)):
-            # save the hist as png, so we can load to word as a picture
-            cur_hist = hists[i]
-            TMP_FILE_PATH = "tmp.png"
-            cur_hist.savefig(TMP_FILE_PATH)
-
-            # load png
-            cell = doc.tables[0].cell(i, 1)
-            cell.add_paragraph().add_run().add_picture(TMP_FILE_PATH, height=Inches(1.9))
-            cell.paragraphs[1].alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-
-            # remove png as it is no longer needed
-            os.remove(TMP_FILE_PATH)
+            add_picture(doc.tables[0].cell(i, 1), hists[i], height=Inches(1.9))
 
         # for paragraph in doc.paragraphs:
         #     self.set_paragraph_rtl(paragraph)
 
-        # avoiding corrupting the word file
-        # the id gets mixed with some of the things of the template file
-        # for further reading - https://github.com/python-openxml/python-docx/issues/455
-        # or need version better than 0.8.7
-        try:
-            docPrs = doc._part._element.findall('.//' + qn('wp:docPr'))
-            for docPr in docPrs:
-                docPr.set('id', str(int(docPr.get('id')) + 100000))
-        except:
-            pass
+        fix_picture_ids(doc)
 
 
-        if not IS_SOCIO:
+        if not is_socio:
             try:
                 print(f"adding literals not classifing")
                 # points to conserve and point to improve
@@ -312,12 +402,15 @@ class Docx_helper(ABC):
 
 
 
-            doc.save(path_to_save)
-        elif classification_df is not None:
-            doc.save(path_to_save)
-            self.insert_classifications(classification_df, path_to_save)
+            with profiling.timed("docx_save"):
+                doc.save(path_to_save)
+        elif render_classifications:
+            template.render(context=self.classifications_context(classification_df))
+            with profiling.timed("docx_save"):
+                template.save(path_to_save)
         else:
-            doc.save(path_to_save)
+            with profiling.timed("docx_save"):
+                doc.save(path_to_save)
 
     def set_paragraph_rtl(self, paragraph):
         # Set paragraph alignment to right
@@ -331,6 +424,10 @@ class Docx_helper(ABC):
         pPr.append(bidi)
 
     def create_text_figure(self, avg_personal, std_personal):
+        """
+        The sentence of the rounded mean, every sentence is rendered only once.
+        :return: the figure as png bytes
+        """
         val_to_sentence = \
             {1: "נמוך ביחס לממוצע",
              2: "מתחת לממוצע",
@@ -338,10 +435,16 @@ class Docx_helper(ABC):
              4: "מעט מעל הממוצע",
              5: "מעל הממוצע",
              6: "גבוה ביחס לממוצע"}
-        fig = plt.figure()
-        rgba2 = text_to_rgba(r""+f"{val_to_sentence[round(avg_personal)][::-1]}", color="black", fontsize=15, dpi=200)
-        fig.figimage(rgba2, 200, 300)
-        return fig
+        value = round(avg_personal)
+        if value not in self.text_figures:
+            # not a pyplot figure, so it is not kept open by pyplot
+            fig = Figure()
+            rgba2 = text_to_rgba(r""+f"{val_to_sentence[value][::-1]}", color="black", fontsize=15, dpi=200)
+            fig.figimage(rgba2, 200, 300)
+            with BytesIO() as buf:
+                fig.savefig(buf, format="png")
+                self.text_figures[value] = buf.getvalue()
+        return self.text_figures[value]
 
     def run_word_creation(self,
                           combined_df: pd.DataFrame,
@@ -351,94 +454,228 @@ class Docx_helper(ABC):
                           verbose: bool = True,
                           start_cadet: str = None,
                           names_to_hashes: bool=False,
-                          is_socio: bool = True):
-
+                          is_socio: bool = True,
+                          sigmas: dict = None,
+                          workers: int = 1,
+                          manifest=None):
+        """
+        Create the word file of every person.
+        :param sigmas: category -> (small, big) sigma thresholds, computed from stats_df when None
+        :param workers: number of processes creating the word files (1 means serial)
+        :param manifest: build_manifest.BuildManifest of the previous run, the word files whose inputs did not
+                         change are not created again. None creates all of them
+        """
+        lookup = self.prepare_word_creation(stats_df, old_stats_df=old_stats_df, sigmas=sigmas)
+
+        # the persons to create a word file for, in the groupby order
+        cadets = []
         reached_start_cadet = start_cadet is None
-        # create word file for every person
-        for df in tqdm(combined_df.groupby("name"), disable=not verbose):
-            person_name = df[0]
+        for person_name, df in combined_df.groupby("name"):
             if not reached_start_cadet:
                 if person_name == start_cadet:
                     reached_start_cadet = True
                 else:
                     continue
 
-            df = df[1]
+            classification_df = name_to_classification.get(person_name) if name_to_classification is not None else None
+            cadets.append((person_name, df, classification_df))
+
+        word_keys = {}
+        if manifest is not None:
+            histogram_keys = self.histogram_keys(lookup)
+            format_hash = file_hash(self.file_format_path)
+            stale = []
+            for person_name, df, classification_df in cadets:
+                key = self.word_file_key(person_name, df, classification_df, lookup, histogram_keys, format_hash,
+                                         names_to_hashes=names_to_hashes, is_socio=is_socio)
+                path = self.word_file_path(person_name, n=df.shape[0], names_to_hashes=names_to_hashes)
+                if not manifest.is_fresh("word", person_name, key, path):
+                    word_keys[person_name] = key
+                    stale.append((person_name, df, classification_df))
+            if verbose:
+                print(f"{len(cadets) - len(stale)} word files are up to date, creating {len(stale)}")
+            all_cadets, cadets = cadets, stale
+        else:
+            all_cadets = cadets
+
+        if workers > 1 and len(cadets) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_word_worker,
+                                     initargs=(self, lookup, names_to_hashes, is_socio)) as executor:
+                for _ in tqdm(executor.map(create_word_file_in_worker, cadets), total=len(cadets),
+                              disable=not verbose):
+                    pass
+        else:
+            for person_name, df, classification_df in tqdm(cadets, disable=not verbose):
+                self.create_cadet_word_file(person_name, df, classification_df, lookup,
+                                            names_to_hashes=names_to_hashes, is_socio=is_socio)
+
+        if manifest is not None:
+            for person_name, key in word_keys.items():
+                manifest.record("word", person_name, key)
+            manifest.save()
 
-            # TODO - voodoo code to get only numerical columns
-            if name_to_classification[person_name] is None:
-                num_columns_index = -3
-            elif (name_to_classification[person_name].shape[0]==0):
-                num_columns_index = -2
+        if names_to_hashes:
+            self.save_names_to_hashes([person_name for person_name, _, _ in all_cadets])
+
+    def prepare_word_creation(self, stats_df: pd.DataFrame, old_stats_df=None, sigmas: dict = None):
+        """
+        :param sigmas: category -> (small, big) sigma thresholds, computed from stats_df when None
+        :return: the StatsLookup the word files are created from
+        """
+        self.sigmas = sigma_thresholds(stats_df) if sigmas is None else sigmas
+        return StatsLookup(stats_df, old_stats_df)
+
+    def stream_word_creation(self, cadets, lookup, names_to_hashes: bool = False, is_socio: bool = True,
+                             manifest=None):
+        """
+        Create the word file of every person as soon as the person arrives.
+        :param cadets: iterable of (person_name, df, classification_df), for example a generator
+        :param lookup: the result of prepare_word_creation
+        :param manifest: build_manifest.BuildManifest, the word files whose inputs did not change are skipped
+        :return: generator of the person names, after the word file of each one is ready
+        """
+        if manifest is not None:
+            histogram_keys = self.histogram_keys(lookup)
+            format_hash = file_hash(self.file_format_path)
+
+        names = []
+        for person_name, df, classification_df in cadets:
+            names.append(person_name)
+            if manifest is not None:
+                key = self.word_file_key(person_name, df, classification_df, lookup, histogram_keys, format_hash,
+                                         names_to_hashes=names_to_hashes, is_socio=is_socio)
+                path = self.word_file_path(person_name, n=df.shape[0], names_to_hashes=names_to_hashes)
+                if not manifest.is_fresh("word", person_name, key, path):
+                    self.create_cadet_word_file(person_name, df, classification_df, lookup,
+                                                names_to_hashes=names_to_hashes, is_socio=is_socio)
+                    manifest.record("word", person_name, key)
+                # saved after every person, a stopped run continues from where it stopped
+                manifest.save()
             else:
-                num_columns_index = -3
-            numerical_columns = df.columns.drop("name")[:num_columns_index]  # drop the conserve, improve and good talpion columns
-            stats_per_person = stats_df[stats_df["name"] == person_name]
-            no_hist_numerical_columns = df.columns.drop("name")[num_columns_index:-2]
-
-            hists = []
-            for category in numerical_columns:
-                # calculate old value
-                old_average = -1
-                if old_stats_df is not None:
-                    # does old_stats_df contain the person?
-                    if len(old_stats_df[old_stats_df["name"] == person_name]) == 0:
-                        print(f"Person {person_name} not found in old stats!\n"
-                              f"probably someone changed their name in the raw data excel file\n")
-
-                    old_res = \
-                        old_stats_df[(old_stats_df["name"] == person_name) & (old_stats_df["category"] == category)][
-                            "mean"]
-                    if len(old_res) > 0:
-                        old_average = old_res.array[0]
-
-                combined_col = combined_df[category]
-                # remove from col every non numeric value row
-                combined_col = combined_col[
-                    combined_col.apply(lambda x: isinstance(x, (int, np.int64, float, np.float64)))]
-                combined_col = combined_col[combined_col.apply(lambda x: x > 0)]  # filter 0 values
-
-                # calculate the number of non 0 comments for this name, for this category
-                N = combined_col[combined_df["name"] == person_name].shape[0]
-
-                avg_total = stats_df[stats_df["category"] == category]["mean"].mean() # mean of all the people
-                # avg_total = combined_col.mean()
-
-                avg_personal = stats_per_person[stats_per_person["category"] == category]["mean"].values[0]
-                std_personal = stats_per_person[stats_per_person["category"] == category]["std"].values[0]
-                all_avgs = stats_df[stats_df["category"] == category]["mean"]
+                self.create_cadet_word_file(person_name, df, classification_df, lookup,
+                                            names_to_hashes=names_to_hashes, is_socio=is_socio)
+            yield person_name
+
+        if names_to_hashes:
+            self.save_names_to_hashes(names)
 
+    def save_names_to_hashes(self, names):
+        # save the hashes of the names to the output directory
+        with open(os.path.join(self.word_output_dir, "names_to_hashes.txt"), "w", encoding="utf-8") as f:
+            for person_name in names:
+                f.write(f"{person_name} => {self.my_hash(person_name)}\n")
+
+    def cadet_columns(self, df, classification_df):
+        """
+        :return: (the categories with a histogram, the categories with only a text figure)
+        """
+        # TODO - voodoo code to get only numerical columns
+        if classification_df is None:
+            num_columns_index = -3
+        elif (classification_df.shape[0]==0):
+            num_columns_index = -2
+        else:
+            num_columns_index = -3
+        numerical_columns = df.columns.drop("name")[:num_columns_index]  # drop the conserve, improve and good talpion columns
+        no_hist_numerical_columns = df.columns.drop("name")[num_columns_index:-2]
+        return numerical_columns, no_hist_numerical_columns
+
+    def histogram_keys(self, lookup):
+        """
+        What the histogram of everyone shows in every category - the heights of its bars, and the mean of everyone
+        (its line moves less than a pixel while its rounded label is the same).
+        :return: category -> json-able value
+        """
+        keys = {}
+        for category, all_avgs in lookup.all_avgs.items():
+            bins, _ = self.histogram_bins(category)
+            keys[category] = [np.histogram(all_avgs, bins=bins)[0].tolist(), round(float(lookup.avg_total[category]), 2)]
+        return keys
+
+    def word_file_key(self, person_name, df, classification_df, lookup, histogram_keys, format_hash,
+                      names_to_hashes=False, is_socio=True):
+        """
+        Hash of everything the word file of the person shows, so it is created again only when one of them changed.
+        :param histogram_keys: the result of histogram_keys
+        :param format_hash: hash of the format file
+        """
+        numerical_columns, no_hist_numerical_columns = self.cadet_columns(df, classification_df)
+        inputs = [person_name, names_to_hashes, is_socio, format_hash, frame_hash(df), frame_hash(classification_df)]
+        for category in numerical_columns:
+            std_personal = lookup.std[(person_name, category)]
+            inputs.append([category, histogram_keys[category], lookup.mean[(person_name, category)], std_personal,
+                           lookup.old_mean.get((person_name, category), -1), lookup.N.get((person_name, category), 0),
+                           self.sigma_text(std_personal, category)])
+        for category in no_hist_numerical_columns:
+            inputs.append([category, lookup.mean[(person_name, category)], lookup.std[(person_name, category)]])
+        return value_hash(inputs)
+
+    @profiling.timed("word_file")
+    def create_cadet_word_file(self, person_name, df, classification_df, lookup, names_to_hashes=False,
+                               is_socio=True):
+        numerical_columns, no_hist_numerical_columns = self.cadet_columns(df, classification_df)
+
+        if lookup.old_names is not None and person_name not in lookup.old_names:
+            print(f"Person {person_name} not found in old stats!\n"
+                  f"probably someone changed their name in the raw data excel file\n")
+
+        hists = []
+        for category in numerical_columns:
+            # the old value, -1 when there is none
+            old_average = lookup.old_mean.get((person_name, category), -1)
+            N = lookup.N.get((person_name, category), 0)
+
+            avg_total = lookup.avg_total[category]
+            avg_personal = lookup.mean[(person_name, category)]
+            std_personal = lookup.std[(person_name, category)]
+            all_avgs = lookup.all_avgs[category]
+
+            with profiling.timed("histogram_render"):
                 hist = self.create_histogram(all_avgs, avg_total, avg_personal, std_personal, category,
                                              old_average=old_average, N=N)
-                hists.append(hist)
+            hists.append(hist)
 
-            # Add the colums whom we want only the avrage and std to be presented without the histogram
-            for category in no_hist_numerical_columns:
-                avg_personal = stats_per_person[stats_per_person["category"] == category]["mean"].values[0]
-                std_personal = stats_per_person[stats_per_person["category"] == category]["std"].values[0]
+        # Add the colums whom we want only the avrage and std to be presented without the histogram
+        for category in no_hist_numerical_columns:
+            avg_personal = lookup.mean[(person_name, category)]
+            std_personal = lookup.std[(person_name, category)]
+            with profiling.timed("text_figure_render"):
                 hist = self.create_text_figure(avg_personal, std_personal)
-                hists.append(hist)
+            hists.append(hist)
+
+
+        N = df.shape[0]
+        print(f"Creating word file for {person_name} (N={N})")
+        if classification_df is not None:
+            if classification_df.shape[0] == 0 and person_name !="ממוצע":
+                print(f"Person {person_name} has no classification")
+                # no classifications - the comments are added as they are
+                is_socio = False
+                other_literal_columns = df.columns.drop(numerical_columns).drop(no_hist_numerical_columns).drop("name")
+                classification_df = [df[lit_col] for lit_col in other_literal_columns]
+
+        with profiling.timed("docx_build"):
+            self.create_word_file(hists, classification_df, person_name, n=N, names_to_hashes=names_to_hashes,
+                                  is_socio=is_socio)
+
+    def __getstate__(self):
+        # the cached histograms are figures of this process, every worker draws its own
+        state = self.__dict__.copy()
+        state["histogram_backgrounds"] = {}
+        return state
 
 
-            N = df.shape[0]
-            print(f"Creating word file for {person_name} (N={N})")
-            df2 = name_to_classification[person_name] if name_to_classification is not None else None
-            if df2 is not None:
-                if df2.shape[0] == 0 and person_name !="ממוצע":
-                    print(f"Person {person_name} has no classification")
-                    global IS_SOCIO
-                    IS_SOCIO = False
-                    other_literal_columns = df.columns.drop(numerical_columns).drop(no_hist_numerical_columns).drop("name")
-                    df2 = [df[lit_col] for lit_col in other_literal_columns]
+# the state of a word creation worker process, set once by init_word_worker
+_word_worker_state = None
 
-            self.create_word_file(hists, df2, person_name, n=N, names_to_hashes=names_to_hashes)
 
-        # save the hash text file to the output directory
-        with open(self.word_output_dir + "\\names_to_hashes.txt", "w", encoding="utf-8") as f:
-            with open("names_to_hashes.txt", "r", encoding="utf-8") as f2:
-                f.write(f2.read())
+def init_word_worker(docx_helper, lookup, names_to_hashes, is_socio):
+    global _word_worker_state
+    _word_worker_state = (docx_helper, lookup, names_to_hashes, is_socio)
 
-        # open the temporary hash file and delete all of the content
-        with open("names_to_hashes.txt", "w", encoding="utf-8") as f:
-            f.write("")
 
+def create_word_file_in_worker(cadet):
+    docx_helper, lookup, names_to_hashes, is_socio = _word_worker_state
+    person_name, df, classification_df = cadet
+    docx_helper.create_cadet_word_file(person_name, df, classification_df, lookup,
+                                       names_to_hashes=names_to_hashes, is_socio=is_socio)
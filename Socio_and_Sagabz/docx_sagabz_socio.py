@@ -3,8 +3,8 @@ from docx_helper import Docx_helper
 from column_constants import MASHOV_SAGZAB, SOCIOMETRY
 
 class Docx_sagzab(Docx_helper):
-    def __init__(self, file_format_path, word_output_dir):
-        super().__init__(file_format_path, word_output_dir)
+    def __init__(self, file_format_path, word_output_dir, cache_histograms=True):
+        super().__init__(file_format_path, word_output_dir, cache_histograms=cache_histograms)
         self.new_columns = MASHOV_SAGZAB
 
     def is_values(self, category: str) -> bool:
@@ -16,8 +16,8 @@ class Docx_sagzab(Docx_helper):
 
 
 class Docx_Socio(Docx_helper):
-    def __init__(self, file_format_path, word_output_dir):
-        super().__init__(file_format_path, word_output_dir)
+    def __init__(self, file_format_path, word_output_dir, cache_histograms=True):
+        super().__init__(file_format_path, word_output_dir, cache_histograms=cache_histograms)
         self.new_columns = SOCIOMETRY
 
     def is_values(self, category: str) -> bool:
@@ -0,0 +1,173 @@
+import json
+import os
+import random
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+
+import profiling
+
+GEMINI_MODEL_NAME = 'gemini-1.0-pro'
+
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_NONE"
+    }
+]
+
+
+class RateLimitError(Exception):
+    """The model refused the request because of too many requests (HTTP 429)."""
+    pass
+
+
+class TokenBucket():
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        """
+        :param requests_per_minute: rate in which the tokens are refilled
+        :param burst: maximal number of tokens, i.e. requests that can be sent at once after an idle time
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.last_refill = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # block until a token is available, and take it
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_secs = (1 - self.tokens) / self.rate
+            sleep(wait_secs)
+
+
+class GeminiBackend():
+    def __init__(self, model_name: str = GEMINI_MODEL_NAME):
+        from dotenv import load_dotenv
+        import google.generativeai as genai
+
+        load_dotenv()
+        GOOGLE_API_KEY = os.environ['GOOGLE_API_KEY']
+        genai.configure(api_key=GOOGLE_API_KEY)
+        self.model = genai.GenerativeModel(model_name, safety_settings=SAFETY_SETTINGS)
+
+    def __call__(self, prompt: str):
+        try:
+            response = self.model.generate_content(prompt)
+        except Exception as e:
+            # google.api_core.exceptions.ResourceExhausted
+            if getattr(e, "code", None) == 429 or type(e).__name__ == "ResourceExhausted":
+                raise RateLimitError(str(e))
+            raise
+        if response is None:
+            return None
+        try:
+            return response.text
+        except ValueError:
+            # the response was blocked (it has no text), sending the prompt again gets the same answer
+            return None
+
+
+class HttpBackend():
+    def __init__(self, url: str, timeout: float = 60.0):
+        """
+        A model behind a simple http api (for example a local stub server):
+        POST {"prompt": ...} and get back {"text": ...}, 429 when there are too many requests.
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, prompt: str):
+        request = urllib.request.Request(self.url, data=json.dumps({"prompt": prompt}).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8")).get("text")
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise RateLimitError(str(e))
+            raise
+
+
+class LLMClient():
+    def __init__(self, backend, requests_per_minute: float = 60, max_concurrency: int = 8, max_retries: int = 5,
+                 backoff_secs: float = 1.0, max_backoff_secs: float = 60.0):
+        """
+        Sends prompts to the model concurrently, limited by a requests per minute token bucket.
+        :param backend: callable prompt -> response text (None when the model did not answer, for example
+                        when the response was blocked. It is not retried)
+        :param max_concurrency: maximal number of requests in flight
+        :param max_retries: number of retries of a failed request, with exponential backoff between them
+        """
+        self.backend = backend
+        self.bucket = TokenBucket(requests_per_minute, burst=max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_secs = backoff_secs
+        self.max_backoff_secs = max_backoff_secs
+
+        self.num_calls = 0
+        self.calls_lock = threading.Lock()
+
+    def generate(self, prompt: str):
+        """
+        :return: the response text, None if the model did not answer or all of the tries failed
+        """
+        for tries in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self.calls_lock:
+                self.num_calls += 1
+
+            profiling.count("llm_requests")
+            try:
+                with profiling.timed("llm_request"):
+                    text = self.backend(prompt)
+                if text is None:
+                    # a blocked or empty response, the same prompt gets the same answer
+                    print("prompt got an empty response, not retrying it\n")
+                    profiling.count("llm_empty_responses")
+                return text
+            except RateLimitError as e:
+                profiling.count("llm_rate_limited")
+                reason = f"rate limit: {e}"
+            except Exception as e:
+                reason = repr(e)
+
+            print(f"prompt failed in {tries + 1} iteration\nreason is:\n{reason}\n")
+            if tries < self.max_retries:
+                backoff = min(self.max_backoff_secs, self.backoff_secs * (2 ** tries))
+                sleep(backoff * random.uniform(0.5, 1.0))
+
+        profiling.count("llm_failed_prompts")
+        return None
+
+    def generate_many(self, prompts):
+        """
+        :return: the responses, in the order of the prompts
+        """
+        if len(prompts) <= 1 or self.max_concurrency <= 1:
+            return [self.generate(prompt) for prompt in prompts]
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(self.generate, prompts))
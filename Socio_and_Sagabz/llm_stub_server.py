@@ -0,0 +1,94 @@
+#!/usr/bin/python
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+
+
+def echo_answer(prompt: str):
+    return prompt
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, answer=echo_answer, latency_secs: float = 0.0, rate_limit_every: int = 0):
+        """
+        A stub of the http model of HttpBackend (POST {"prompt": ...} -> {"text": ...}), with latency and 429s.
+        :param port: port on localhost, 0 for a free port (see self.url)
+        :param answer: callable prompt -> response text (None for an empty response)
+        :param latency_secs: the time every request takes
+        :param rate_limit_every: every rate_limit_every-th request is answered with 429, 0 for never
+        """
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.answer = answer
+        self.latency_secs = latency_secs
+        self.rate_limit_every = rate_limit_every
+        self.lock = threading.Lock()
+        # (monotonic time, prompt, status) of every request, in the order they arrived
+        self.requests = []
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def record(self, prompt: str):
+        """
+        :return: the status of the request
+        """
+        with self.lock:
+            number = len(self.requests) + 1
+            status = 429 if self.rate_limit_every > 0 and number % self.rate_limit_every == 0 else 200
+            self.requests.append((monotonic(), prompt, status))
+        return status
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8"))["prompt"]
+        status = self.server.record(prompt)
+        sleep(self.server.latency_secs)
+
+        body = json.dumps({"text": self.server.answer(prompt)} if status == 200 else {"error": "too many requests"})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        # no line for every request
+        pass
+
+
+if __name__ == "__main__":
+    from benchmark import StubBackend
+
+    parser = argparse.ArgumentParser(description="a stub of the classification model for --llm-url, answers like the\
+                                                  benchmark stub with latency and 429s")
+    parser.add_argument('--port', type=int, default=8000, help="port on localhost.")
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds every request takes.")
+    parser.add_argument('--rate-limit-every', type=int, default=0,
+                        help="answer every n-th request with 429 (0 - never).")
+    args = parser.parse_args()
+
+    server = StubServer(args.port, answer=StubBackend(), latency_secs=args.latency,
+                        rate_limit_every=args.rate_limit_every)
+    print(f"stub model on {server.url}")
+    server.serve_forever()
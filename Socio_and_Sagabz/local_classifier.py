@@ -0,0 +1,140 @@
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from socio_to_classification import CATEGORIES, SOURCE_LLM, SOURCE_LOCAL, remove_knowing_level
+
+
+class CommentClassifier(ABC):
+    @abstractmethod
+    def classify(self, texts):
+        """
+        :param texts: hebrew comments
+        :return: (category, confidence) of every text, the category is one of CATEGORIES and the confidence is in [0, 1]
+        """
+        pass
+
+
+class NgramClassifier(CommentClassifier):
+    def __init__(self, ngram_range=(2, 4), alpha: float = 0.1):
+        """
+        Multinomial naive bayes over the character n-grams of the comments (a linear model of the n-gram counts).
+        Works on the hebrew comments as they are, without translating them.
+        :param ngram_range: minimal and maximal length of the n-grams
+        :param alpha: smoothing of the n-gram counts
+        """
+        self.ngram_range = ngram_range
+        self.alpha = alpha
+        self.vocabulary = {}
+        self.class_log_prior = None
+        self.feature_log_prob = None
+
+    def ngrams(self, text):
+        text = " " + re.sub(r"\s+", " ", str(text)).strip().lower() + " "
+        min_n, max_n = self.ngram_range
+        return [text[i:i + n] for n in range(min_n, max_n + 1) for i in range(len(text) - n + 1)]
+
+    def fit(self, texts, categories):
+        """
+        :param texts: hebrew comments
+        :param categories: the category of every comment (one of CATEGORIES)
+        :return: self
+        """
+        counts = [Counter(self.ngrams(text)) for text in texts]
+        self.vocabulary = {}
+        for text_counts in counts:
+            for ngram in text_counts:
+                self.vocabulary.setdefault(ngram, len(self.vocabulary))
+
+        feature_counts = np.zeros((len(CATEGORIES), len(self.vocabulary)))
+        class_counts = np.zeros(len(CATEGORIES))
+        for text_counts, category in zip(counts, categories):
+            class_index = CATEGORIES.index(category)
+            class_counts[class_index] += 1
+            indices = [self.vocabulary[ngram] for ngram in text_counts]
+            feature_counts[class_index, indices] += list(text_counts.values())
+
+        # categories without examples are never predicted
+        with np.errstate(divide="ignore"):
+            self.class_log_prior = np.log(class_counts / class_counts.sum())
+        smoothed = feature_counts + self.alpha
+        self.feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        return self
+
+    def classify(self, texts):
+        results = []
+        for text in texts:
+            text_counts = Counter(ngram for ngram in self.ngrams(text) if ngram in self.vocabulary)
+            scores = self.class_log_prior.copy()
+            if len(text_counts) > 0:
+                indices = [self.vocabulary[ngram] for ngram in text_counts]
+                scores += self.feature_log_prob[:, indices] @ np.fromiter(text_counts.values(), dtype=float)
+
+            # softmax of the scores is the probability of every category
+            probabilities = np.exp(scores - scores.max())
+            probabilities /= probabilities.sum()
+            best = int(np.argmax(probabilities))
+            results.append((CATEGORIES[best], float(probabilities[best])))
+        return results
+
+
+def load_classification_sheets(excel_dir: str):
+    """
+    Read the comments and their categories from the Classification sheets of the cadets excel files
+    (of a previous run). The comments the local classifier classified are skipped, it is not trained on its own
+    classifications (the sheets without a Source column are from before the local classifier, only the model wrote
+    them).
+    :return: (texts, categories)
+    """
+    texts, categories = [], []
+    if excel_dir is None or not os.path.isdir(excel_dir):
+        return texts, categories
+
+    for file_name in sorted(os.listdir(excel_dir)):
+        if not file_name.endswith(".xlsx") or file_name.startswith("~$"):
+            continue
+        with pd.ExcelFile(os.path.join(excel_dir, file_name), engine='openpyxl') as excel:
+            if "Classification" not in excel.sheet_names:
+                continue
+            classification_df = pd.read_excel(excel, sheet_name="Classification", header=0, dtype=object)
+
+        for kind, suffix in (("conserve", ""), ("improve", "2")):
+            original_col, source_col = f"Original_{kind}", f"Source_{kind}"
+            category_cols = [f"{category}{suffix}" for category in CATEGORIES]
+            if any(col not in classification_df for col in [original_col] + category_cols):
+                continue
+            sources = classification_df[source_col] if source_col in classification_df \
+                else [SOURCE_LLM] * len(classification_df)
+            is_category = classification_df[category_cols].isin(["True", True, "TRUE", "true"])
+            # only the comments with exactly one category, not from the local classifier
+            for text, source, row in zip(classification_df[original_col], sources, is_category.values):
+                if pd.notna(text) and source != SOURCE_LOCAL and row.sum() == 1:
+                    texts.append(remove_knowing_level(text))
+                    categories.append(CATEGORIES[int(np.argmax(row))])
+
+    return texts, categories
+
+
+def train_local_classifier(excel_dirs, min_examples: int = 20):
+    """
+    :param excel_dirs: directories of cadets excel files with Classification sheets
+    :param min_examples: minimal number of comments classified by the model needed for training
+    :return: NgramClassifier trained on the comments classified by the model, None if there are not enough of them
+    """
+    texts, categories = [], []
+    for excel_dir in excel_dirs:
+        dir_texts, dir_categories = load_classification_sheets(excel_dir)
+        texts += dir_texts
+        categories += dir_categories
+
+    if len(texts) < min_examples:
+        print(f"only {len(texts)} comments classified by the model were found in {excel_dirs},"
+              f" not training a local classifier")
+        return None
+
+    print(f"training a local classifier on {len(texts)} classified comments")
+    return NgramClassifier().fit(texts, categories)
@@ -30,6 +30,55 @@ if __name__ == "__main__":
     parser.add_argument('--old-stats-path', type=str, default=None, help="old stats path.")
     parser.add_argument('--raw-data-path', type=str, default=r"Excels", help="path for excels files.")
     parser.add_argument('--names-to-hashes', type=str, default=r"False", help="convert names to hashes. for unanimous data.")
+    parser.add_argument('--workers', type=int, default=1, help="number of processes used for parsing the raw excel files and for creating the word files.")
+    parser.add_argument('--no-parse-cache', action='store_true', default=False,
+                        help="parse all of the raw excel files again, instead of reusing the parses of unchanged files\
+                              from <output path>/parse_cache.")
+    parser.add_argument('--no-histogram-cache', action='store_true', default=False,
+                        help="draw every histogram from scratch, instead of drawing the histogram of all the cadets\
+                              once per category and only drawing each cadet over it.")
+    parser.add_argument('--llm-requests-per-minute', type=float, default=60, help="maximal rate of the classification requests.")
+    parser.add_argument('--llm-concurrency', type=int, default=8, help="maximal number of classification requests in flight.")
+    parser.add_argument('--llm-url', type=str, default=None,
+                        help="send the classification requests to this http url (for example a local stub server)\
+                              instead of gemini. POST {\"prompt\": ...} -> {\"text\": ...}")
+    parser.add_argument('--llm-batch-size', type=int, default=20,
+                        help="number of comments sent in one translation / classification prompt. 1 sends a prompt per comment.")
+    parser.add_argument('--no-classification-cache', action='store_true', default=False,
+                        help="send every comment to the model again, instead of reusing the translations and\
+                              classifications saved in <output path>/classification_cache.sqlite.")
+    parser.add_argument('--fused-classification', action='store_true', default=False,
+                        help="translate and classify every comment in the same request, instead of a translation\
+                              request and then a classification request.")
+    parser.add_argument('--dont-save-classification-excels', action='store_true', default=False,
+                        help="keep the translations and classifications only in memory for the word files, without\
+                              adding them to the excel of every cadet.")
+    parser.add_argument('--classifier', type=str, default="llm", choices=["llm", "local"],
+                        help="llm - classify every comment with the model. local - classify the comments with a local\
+                              classifier trained on the Classification sheets of previous runs, and send to the model\
+                              only the comments it is not confident about.")
+    parser.add_argument('--classifier-min-confidence', type=float, default=0.6,
+                        help="the comments the local classifier is less confident about are sent to the model.\
+                              0 classifies everything locally (no network).")
+    parser.add_argument('--classifier-training-dir', type=str, nargs='+', default=None,
+                        help="directories of cadets excel files with Classification sheets to train the local\
+                              classifier on, only on the comments classified by the model (default - <output\
+                              path>/raw_data of the previous run).")
+    parser.add_argument('--incremental', action='store_true', default=False,
+                        help="create again only the cadets excels, classifications and word files whose inputs changed\
+                              since the last run (the hashes are saved in <output path>/build_manifest.json).")
+    parser.add_argument('--stream', action='store_true', default=False,
+                        help="create the statistics first, and then the excel, classification and word file of every\
+                              cadet one after the other (only a few cadets in memory, the first word files are\
+                              ready early). The word files are created without --workers.")
+    parser.add_argument('--profile', action='store_true', default=False,
+                        help="time every stage and the items inside them (histograms, word files, classification\
+                              requests), and save a json report to <output path>/profile_report.json.")
+    parser.add_argument('--profile-cprofile', action='store_true', default=False,
+                        help="with --profile, also run cProfile over the run (saved to <output path>/profile.prof).")
+    parser.add_argument('--profile-tracemalloc', action='store_true', default=False,
+                        help="with --profile, also trace the python allocations for the peak memory of every stage\
+                              (slows the run).")
 
     args = parser.parse_args()
     
@@ -57,7 +106,25 @@ if __name__ == "__main__":
                            run_classification=run_classification,
                            start_task=start_task,
                            start_cadet=start_cadet,
-                           names_to_hashes=args.names_to_hashes)
+                           names_to_hashes=args.names_to_hashes,
+                           workers=args.workers,
+                           use_parse_cache=not args.no_parse_cache,
+                           cache_histograms=not args.no_histogram_cache,
+                           llm_requests_per_minute=args.llm_requests_per_minute,
+                           llm_concurrency=args.llm_concurrency,
+                           llm_url=args.llm_url,
+                           llm_batch_size=args.llm_batch_size,
+                           use_classification_cache=not args.no_classification_cache,
+                           llm_fused=args.fused_classification,
+                           save_classification_excels=not args.dont_save_classification_excels,
+                           classifier=args.classifier,
+                           classifier_min_confidence=args.classifier_min_confidence,
+                           classifier_training_dirs=args.classifier_training_dir,
+                           incremental=args.incremental,
+                           stream=args.stream,
+                           profile=args.profile,
+                           profile_cprofile=args.profile_cprofile,
+                           profile_tracemalloc=args.profile_tracemalloc)
         run_obj.run()
 
     elif args.run_sagabz:
@@ -68,7 +135,25 @@ if __name__ == "__main__":
                            testing=True,
                            run_classification=run_classification,
                            start_task=start_task,
-                           start_cadet=start_cadet)
+                           start_cadet=start_cadet,
+                           workers=args.workers,
+                           use_parse_cache=not args.no_parse_cache,
+                           cache_histograms=not args.no_histogram_cache,
+                           llm_requests_per_minute=args.llm_requests_per_minute,
+                           llm_concurrency=args.llm_concurrency,
+                           llm_url=args.llm_url,
+                           llm_batch_size=args.llm_batch_size,
+                           use_classification_cache=not args.no_classification_cache,
+                           llm_fused=args.fused_classification,
+                           save_classification_excels=not args.dont_save_classification_excels,
+                           classifier=args.classifier,
+                           classifier_min_confidence=args.classifier_min_confidence,
+                           classifier_training_dirs=args.classifier_training_dir,
+                           incremental=args.incremental,
+                           stream=args.stream,
+                           profile=args.profile,
+                           profile_cprofile=args.profile_cprofile,
+                           profile_tracemalloc=args.profile_tracemalloc)
         run_obj.run()
 
     else:
@@ -1,22 +1,35 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
 import warnings
 import pandas as pd
 import os
 
+# bump when the parsing of a single excel changes, so old cached parses are not reused
+PARSE_CACHE_VERSION = 1
+
+
 class PreProcess(ABC):
     def __init__(self):
         self.column_names = self.get_column_names()
     
     
-    def gen_combined_dataframe(self, input_dir_path):
+    def gen_combined_dataframe(self, input_dir_path, workers=1, cache_dir=None):
+        """
+        Parse every excel file in the input dir and combine them into one dataframe.
+        :param input_dir_path: directory of the raters excel files
+        :param workers: number of processes used for parsing the files (1 means serial)
+        :param cache_dir: directory of the per file parse cache (keyed by the file content hash), None disables it
+        :return: the combined dataframe, rows are ordered like the serial parse
+        """
         self.input_dir = input_dir_path
 
         # sanity checks
         if not os.path.isdir(self.input_dir):
             raise Exception(f"the path is not a dir: {self.input_dir}")
 
-        # process all excel files as dataframes
-        dataframes = []
+        # collect all excel files, the order of this list is the order of the rows in the combined table
+        excel_paths = []
         for file_path in os.listdir(self.input_dir):
             # weird thing that it showed semi open files (with the $ symbol - denoting they are open)
             if "$" in file_path:
@@ -28,15 +41,52 @@ class PreProcess(ABC):
                 warnings.warn("skipping the file")
                 continue
 
-            df = pd.read_excel(os.path.join(self.input_dir, file_path))
-            df = self.remove_unwanted_data(df)
-            df = df.rename(columns={df.columns[i]: self.column_names[i] for i in range(len(self.column_names))})
-
-            dataframes.append(df)
+            excel_paths.append(os.path.join(self.input_dir, file_path))
+
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        # load whatever we already parsed in previous runs, and parse only the rest
+        dataframes = [None] * len(excel_paths)
+        cache_paths = [None] * len(excel_paths)
+        to_parse = []
+        for i, excel_path in enumerate(excel_paths):
+            if cache_dir is not None:
+                cache_paths[i] = os.path.join(cache_dir, self.parse_cache_name(excel_path))
+                if os.path.isfile(cache_paths[i]):
+                    dataframes[i] = pd.read_pickle(cache_paths[i])
+                    continue
+            to_parse.append(i)
+
+        paths_to_parse = [excel_paths[i] for i in to_parse]
+        if workers > 1 and len(paths_to_parse) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed = list(executor.map(self.parse_excel, paths_to_parse))
+        else:
+            parsed = [self.parse_excel(excel_path) for excel_path in paths_to_parse]
+
+        for i, df in zip(to_parse, parsed):
+            dataframes[i] = df
+            if cache_paths[i] is not None:
+                df.to_pickle(cache_paths[i])
 
         # combine everything to one single big table
         # Iterate through the remaining dataframes and update the base dataframe
         return self.combine_dataframes(dataframes)
+
+
+    def parse_excel(self, excel_path):
+        df = pd.read_excel(excel_path)
+        df = self.remove_unwanted_data(df)
+        df = df.rename(columns={df.columns[i]: self.column_names[i] for i in range(len(self.column_names))})
+        return df
+
+
+    def parse_cache_name(self, excel_path):
+        # the same file is parsed differently by socio and sagabz, so the class is a part of the key
+        with open(excel_path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        return f"{type(self).__name__}_v{PARSE_CACHE_VERSION}_{content_hash}.pkl"
     
     
     def gen_data_per_person(self, combined_dataframe):
@@ -49,9 +99,9 @@ class PreProcess(ABC):
         
     
 
-    def run(self, input_dir_path):
+    def run(self, input_dir_path, workers=1, cache_dir=None):
         self.input_dir = input_dir_path
-        combined_dataframe = self.gen_combined_dataframe(input_dir_path)
+        combined_dataframe = self.gen_combined_dataframe(input_dir_path, workers=workers, cache_dir=cache_dir)
 
         # drop all rows that the group by "name" in groupby is less than 3
         # if not testing:
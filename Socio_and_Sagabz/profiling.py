@@ -0,0 +1,151 @@
+import cProfile
+import json
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # windows
+    resource = None
+
+# the profiler of the current run, None when the run is not profiled (then the timers do nothing)
+_active_profiler = None
+
+
+def peak_rss_mb(children: bool = False):
+    """
+    :param children: the peak of the child processes that ended (the --workers processes) instead of this process
+    :return: the peak resident memory (MB) of the process over its whole life, None when it is not available
+    """
+    if resource is None:
+        return None
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Profiler():
+    def __init__(self, use_cprofile: bool = False, use_tracemalloc: bool = False, workers: int = 1):
+        """
+        Collects the wall time of the stages of a run and of the items inside them (a histogram, a request...).
+        :param use_cprofile: also run cProfile over the whole run
+        :param use_tracemalloc: also trace the python allocations, for the peak allocated memory of every stage
+        :param workers: the --workers of the run, the items inside the workers processes are not collected
+        """
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.workers = workers
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+        # the items are timed from several threads (the classification requests)
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.items = {}
+        self.counters = {}
+        self.start_time = None
+        self.total = None
+
+    def start(self):
+        self.start_time = perf_counter()
+        if self.use_tracemalloc:
+            tracemalloc.start()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def stop(self):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.use_tracemalloc:
+            tracemalloc.stop()
+        self.total = perf_counter() - self.start_time
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.use_tracemalloc:
+            tracemalloc.reset_peak()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            stage = {"seconds": perf_counter() - start}
+            # the peak rss is of the whole process, only the traced peak (reset above) is of the stage itself
+            if self.use_tracemalloc:
+                stage["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            self.stages[name] = stage
+
+    def add_item(self, name: str, seconds: float):
+        with self.lock:
+            self.items.setdefault(name, []).append(seconds)
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        """
+        :return: json-able dict - every stage (its seconds, and its peak traced memory with use_tracemalloc), the
+                 percentiles of the seconds of every item, the counters, the peak memory of the run and of its
+                 workers processes, and the number of workers (with more than 1 the word files items are missing)
+        """
+        items = {}
+        for name, seconds in self.items.items():
+            seconds = np.array(seconds)
+            items[name] = {"count": len(seconds), "total": float(seconds.sum()), "mean": float(seconds.mean()),
+                           "p50": float(np.percentile(seconds, 50)), "p90": float(np.percentile(seconds, 90)),
+                           "p99": float(np.percentile(seconds, 99)), "max": float(seconds.max())}
+        return {"total_seconds": self.total, "workers": self.workers, "stages": self.stages, "items": items,
+                "counters": self.counters, "peak_rss_mb": peak_rss_mb(),
+                "peak_workers_rss_mb": peak_rss_mb(children=True)}
+
+    def save(self, report_path: str, cprofile_path: str = None):
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=1)
+        if self.cprofile is not None and cprofile_path is not None:
+            # can be read with pstats or snakeviz
+            self.cprofile.dump_stats(cprofile_path)
+
+
+@contextmanager
+def profile_run(profiler: Profiler):
+    """
+    Make the profiler the active profiler of the stages and timers, while the run is inside the block.
+    """
+    global _active_profiler
+    _active_profiler = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active_profiler = None
+
+
+@contextmanager
+def stage(name: str):
+    # a stage of the run, does nothing when the run is not profiled
+    if _active_profiler is None:
+        yield
+        return
+    with _active_profiler.stage(name):
+        yield
+
+
+@contextmanager
+def timed(name: str):
+    # an item inside a stage (a histogram, a word file...), does nothing when the run is not profiled
+    if _active_profiler is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        _active_profiler.add_item(name, perf_counter() - start)
+
+
+def count(name: str, amount: int = 1):
+    if _active_profiler is not None:
+        _active_profiler.count(name, amount)
@@ -1,5 +1,9 @@
 import os
+import sys
+import json
 import pprint
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 from tkinter import Tk
 from tkinter.filedialog import askdirectory
@@ -7,9 +11,21 @@ import pandas as pd
 import numpy as np
 import tqdm
 
-from statistics_socio import Statistics
-from column_constants import SIGMAS
+from statistics_socio import Statistics, sigma_thresholds
 import socio_to_classification
+import local_classifier
+from build_manifest import BuildManifest, file_hash, frame_hash, value_hash
+import profiling
+# the modules shared with the other packages are in shared/ in the root of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.tables import INTERMEDIATE_EXTENSION, load_table
+
+COMBINED_DATA_NAME = "combined_data"
+STATS_NAME = "stats_excel"
+SIGMAS_NAME = "sigmas.json"
+# number of persons classified together in the streaming mode (their comments are sent in the same batch prompts),
+# the next ones are classified while the word files of the current ones are created
+STREAM_LOOKAHEAD = 8
 
 
 class SocioAndSagabz():
@@ -22,7 +38,25 @@ class SocioAndSagabz():
                  run_classification=True,
                  start_task=None,
                  start_cadet=None,
-                 names_to_hashes=False
+                 names_to_hashes=False,
+                 workers=1,
+                 use_parse_cache=True,
+                 cache_histograms=True,
+                 llm_requests_per_minute=60,
+                 llm_concurrency=8,
+                 llm_url=None,
+                 llm_batch_size=20,
+                 use_classification_cache=True,
+                 llm_fused=False,
+                 save_classification_excels=True,
+                 classifier="llm",
+                 classifier_min_confidence=0.6,
+                 classifier_training_dirs=None,
+                 incremental=False,
+                 stream=False,
+                 profile=False,
+                 profile_cprofile=False,
+                 profile_tracemalloc=False
                  ):
         self.inputs_path = inputs_path
         self.outputs_path = outputs_path
@@ -32,6 +66,21 @@ class SocioAndSagabz():
         self.run_classification = run_classification
         self.start_task = start_task
         self.start_cadet = start_cadet
+        self.workers = workers
+        self.cache_histograms = cache_histograms
+        self.llm_requests_per_minute = llm_requests_per_minute
+        self.llm_concurrency = llm_concurrency
+        self.llm_url = llm_url
+        self.llm_batch_size = llm_batch_size
+        self.llm_fused = llm_fused
+        self.save_classification_excels = save_classification_excels
+        self.classifier = classifier
+        self.classifier_min_confidence = classifier_min_confidence
+        self.incremental = incremental
+        self.stream = stream
+        self.profile = profile
+        self.profile_cprofile = profile_cprofile
+        self.profile_tracemalloc = profile_tracemalloc
         
         self.combine_excels = True
         self.split_excels = True
@@ -39,10 +88,21 @@ class SocioAndSagabz():
         self.analyze_start_task()
         
         self.raw_data_dir_path = os.path.join(self.outputs_path, "raw_data")
+        self.parse_cache_dir_path = os.path.join(self.outputs_path, "parse_cache") if use_parse_cache else None
+        self.classification_cache_path = os.path.join(self.outputs_path, "classification_cache.sqlite") \
+            if use_classification_cache else None
+        # the local classifier is trained on the Classification sheets of the previous runs, on the comments the
+        # model classified (not on its own classifications)
+        self.classifier_training_dirs = classifier_training_dirs if classifier_training_dirs is not None \
+            else [self.raw_data_dir_path]
+        # the hashes of the inputs of every output of the previous run, only the outputs whose inputs changed
+        # are built again
+        self.manifest = BuildManifest(os.path.join(self.outputs_path, "build_manifest.json")) if incremental else None
         self.combined_df = None
         self.data_per_person_list = None
         self.name_to_classification = None
         self.stats_df = None
+        self.sigmas = None
         self.names_to_hashes = names_to_hashes
 
 
@@ -83,120 +143,393 @@ class SocioAndSagabz():
             
     
     
+    def person_excel_path(self, df):
+        N = df.shape[0]
+        person_name = df["name"].iloc[0]
+
+        file_title = os.path.join(self.raw_data_dir_path, f"{person_name} (N={N}).xlsx")
+        file_title = file_title.replace('"', '')
+        file_title = file_title.replace("'", '')
+        return file_title
+    
+    
     def export_to_excel(self, df, file_title):
         df.to_excel(file_title, index=False)
     
     
+    def export_sheets_to_excel(self, sheets, file_title):
+        # write only, the sheets are in the order of the dict (the first one is the active sheet)
+        with pd.ExcelWriter(file_title, engine='openpyxl') as writer:
+            for sheet_name, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+    
+    
     def load_from_excel(self, path):
         return pd.read_excel(path, header=0, engine='openpyxl')
     
     
-    def preprocess_and_combine(self):
+    def export_intermediate(self, df, name):
+        # the pipeline resumes from the intermediate, the excel is for the users.
+        # the intermediate is saved last, so it is not older than the excel
+        self.export_to_excel(df, os.path.join(self.outputs_path, name + ".xlsx"))
+        df.to_pickle(os.path.join(self.outputs_path, name + INTERMEDIATE_EXTENSION))
+    
+    
+    def load_intermediate(self, name):
+        return load_table(os.path.join(self.outputs_path, name + ".xlsx"))
+    
+    
+    def preprocess_and_combine(self, split_per_person=True):
         print("---------------------------------")
         print("Combining and Preprocessing Data")
         preprocess_obj = self.get_preprocess_obj()()
-        combined_data_path = os.path.join(self.outputs_path, "combined_data.xlsx")
+
+        if self.manifest is not None:
+            rater_hashes = {file_name: file_hash(os.path.join(self.inputs_path, file_name))
+                            for file_name in sorted(os.listdir(self.inputs_path)) if file_name.endswith(".xlsx")}
+            changed = self.manifest.update_inputs("rater_files", rater_hashes)
+            print(f"{len(changed)} rater files changed since the last run: {changed}")
 
         if self.combine_excels:
-            self.combined_df, self.data_per_person_list = preprocess_obj.run(self.inputs_path)
-            self.export_to_excel(self.combined_df, combined_data_path)
+            self.combined_df = preprocess_obj.gen_combined_dataframe(self.inputs_path,
+                                                                     workers=self.workers,
+                                                                     cache_dir=self.parse_cache_dir_path)
+            self.export_intermediate(self.combined_df, COMBINED_DATA_NAME)
         
         else:
-            self.combined_df = self.load_from_excel(combined_data_path)
-            self.data_per_person_list = preprocess_obj.gen_data_per_person(self.combined_df)
+            self.combined_df = self.load_intermediate(COMBINED_DATA_NAME)
+
+        # the streaming mode slices every person only when it is needed
+        self.data_per_person_list = preprocess_obj.gen_data_per_person(self.combined_df) if split_per_person else None
         
     
-    def create_individual_excel(self):
-        self.ensure_dir(self.raw_data_dir_path)
-        # create the classification model
-        classification_model = socio_to_classification.classification_model(self.raw_data_dir_path)
-        self.name_to_classification = {}
-        
+    def create_classification_model(self):
+        # train the local classifier before the excels of this run replace the ones it learns from
+        classifier = None
+        if self.run_classification and self.classifier == "local":
+            classifier = local_classifier.train_local_classifier(self.classifier_training_dirs)
+
+        return socio_to_classification.classification_model(
+            self.raw_data_dir_path,
+            requests_per_minute=self.llm_requests_per_minute,
+            max_concurrency=self.llm_concurrency,
+            llm_url=self.llm_url,
+            batch_size=self.llm_batch_size,
+            cache_path=self.classification_cache_path,
+            fused=self.llm_fused,
+            classifier=classifier,
+            min_confidence=self.classifier_min_confidence)
+    
+    
+    def iter_persons(self):
+        """
+        :return: generator of the data of every person (from the start cadet), in the groupby order
+        """
+        if self.data_per_person_list is not None:
+            persons = self.data_per_person_list
+        else:
+            # without the list of copies, every person is sliced only when it is needed
+            persons = (df for _, df in self.combined_df.groupby(by="name"))
+
         reached_target_cadet = self.start_cadet is None
-        
-        for df in tqdm.tqdm(self.data_per_person_list):
-            # creates an excel of each person and the comments he got
-            N = df.shape[0]
+        for df in persons:
             person_name = df["name"].iloc[0]
             if not reached_target_cadet:
                 if person_name == self.start_cadet:
                     reached_target_cadet = True
                 else:
                     continue
-            
-            file_title = os.path.join(self.raw_data_dir_path, f"{person_name} (N={N}).xlsx")
-            file_title = file_title.replace('"', '')
-            file_title = file_title.replace("'", '')
+            yield df
+    
+    
+    def excel_key(self, df):
+        settings = [self.run_classification, self.save_classification_excels, self.classifier,
+                    self.classifier_min_confidence, self.llm_fused, self.llm_url]
+        return value_hash([frame_hash(df), settings])
+    
+    
+    def fresh_classification(self, classification_model, df, key):
+        """
+        :return: (True, the classification of the previous run) if the excel of the person is up to date,
+                 (False, None) if it should be created again
+        """
+        person_name = df["name"].iloc[0]
+        file_title = self.person_excel_path(df)
+        if self.manifest.is_fresh("excel", person_name, key, file_title):
+            classification_df = classification_model.load_classification(file_title)
+            if classification_df is not None or not self.run_classification:
+                return True, classification_df
+        return False, None
+    
+    
+    def classify_person(self, classification_model, df, excels_to_save=None):
+        """
+        Create the excel of the person, with the translation and classification of the comments on them.
+        :param excels_to_save: list to add the excel to, so it is written later. None writes it now
+        :return: the classification DataFrame (None when there is none)
+        """
+        file_title = self.person_excel_path(df)
 
-            if self.split_excels:
-                # print("analyzing: ", df["name"].iloc[0], "N=", N)
-                self.export_to_excel(df, file_title)
+        classification_df = None
+        if self.run_classification:
+            # Creates translation and classification for each person, kept in memory for the word files
+            with profiling.timed("classify_cadet"):
+                translation_df, classification_df = classification_model.run_classification_for_cadet(df)
+            if self.save_classification_excels:
+                sheets = {"Sheet1": df, "Translation": translation_df, "Classification": classification_df}
+                if excels_to_save is not None:
+                    excels_to_save.append((file_title, sheets))
+                else:
+                    self.export_sheets_to_excel(sheets, file_title)
+                return classification_df
 
-            # Creates translation and classification for each person
-            self.name_to_classification[person_name] = classification_model.run_classification_for_cadet(file_title, return_if_classified=self.run_classification)
+        if self.split_excels:
+            # print("analyzing: ", df["name"].iloc[0], "N=", N)
+            self.export_to_excel(df, file_title)
 
+        if not self.run_classification:
+            # the classification of a previous run, if there is one
+            classification_df = classification_model.load_classification(file_title)
+        return classification_df
+    
+    
+    def prefetch_classifications(self, classification_model, persons):
+        """
+        Translate and classify the comments of the persons together (each distinct comment once, in batch prompts),
+        the classification of every one of them is then served from the answers of the classification model.
+        :param persons: list of the data of the persons
+        """
+        if not self.run_classification:
+            return
+        # the second column is how well the writer knows the person
+        comments, knowing_values = [], []
+        for df in persons:
+            for col in df.columns[-2:]:
+                has_comment = df[col].notna()
+                comments += df.loc[has_comment, col].tolist()
+                knowing_values += df.loc[has_comment, df.columns[1]].tolist()
+        with profiling.timed("classification_prefetch"):
+            classification_model.prefetch(comments, knowing_values)
+    
+    
+    def create_individual_excel(self):
+        self.ensure_dir(self.raw_data_dir_path)
+        # create the classification model
+        classification_model = self.create_classification_model()
+        self.name_to_classification = {}
+        data_per_person_list = list(self.iter_persons())
+
+        excel_keys = {}
+        if self.manifest is not None:
+            # the excels (and classifications) of the persons whose rows did not change are kept
+            stale = []
+            for df in data_per_person_list:
+                person_name = df["name"].iloc[0]
+                key = self.excel_key(df)
+                fresh, classification_df = self.fresh_classification(classification_model, df, key)
+                if fresh:
+                    self.name_to_classification[person_name] = classification_df
+                    continue
+                excel_keys[person_name] = key
+                stale.append(df)
+            print(f"{len(data_per_person_list) - len(stale)} cadets excels are up to date, creating {len(stale)}")
+            data_per_person_list = stale
+
+        self.prefetch_classifications(classification_model, data_per_person_list)
+        
+        excels_to_save = []
+        for df in tqdm.tqdm(data_per_person_list):
+            # creates an excel of each person and the comments he got
+            person_name = df["name"].iloc[0]
+            self.name_to_classification[person_name] = self.classify_person(classification_model, df,
+                                                                            excels_to_save=excels_to_save)
+
+        # every excel is written once, with its translation and classification sheets
+        for file_title, sheets in tqdm.tqdm(excels_to_save):
+            self.export_sheets_to_excel(sheets, file_title)
+
+        if self.manifest is not None:
+            for person_name, key in excel_keys.items():
+                self.manifest.record("excel", person_name, key)
+            self.manifest.save()
+    
+    
+    def stream_classifications(self, classification_model):
+        """
+        Create the excel and the classification of every person, one after the other. The persons are classified
+        in chunks of STREAM_LOOKAHEAD persons, the comments of a chunk together (each distinct comment once, in
+        batch prompts). The next chunk is classified in the background while the current one is used.
+        :return: generator of (person_name, df, classification_df)
+        """
+        def classify_chunk(chunk):
+            classifications = [None] * len(chunk)
+            keys, stale = {}, []
+            for i, df in enumerate(chunk):
+                if self.manifest is not None:
+                    keys[i] = self.excel_key(df)
+                    fresh, classifications[i] = self.fresh_classification(classification_model, df, keys[i])
+                    if fresh:
+                        continue
+                stale.append(i)
+
+            self.prefetch_classifications(classification_model, [chunk[i] for i in stale])
+            for i in stale:
+                classifications[i] = self.classify_person(classification_model, chunk[i])
+                if self.manifest is not None:
+                    self.manifest.record("excel", chunk[i]["name"].iloc[0], keys[i])
+            return classifications
+
+        def chunks():
+            chunk = []
+            for df in self.iter_persons():
+                chunk.append(df)
+                if len(chunk) == STREAM_LOOKAHEAD:
+                    yield chunk
+                    chunk = []
+            if len(chunk) > 0:
+                yield chunk
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = deque()
+            for chunk in chunks():
+                pending.append((chunk, executor.submit(classify_chunk, chunk)))
+                if len(pending) > 1:
+                    chunk, future = pending.popleft()
+                    for df, classification_df in zip(chunk, future.result()):
+                        yield df["name"].iloc[0], df, classification_df
+            while len(pending) > 0:
+                chunk, future = pending.popleft()
+                for df, classification_df in zip(chunk, future.result()):
+                    yield df["name"].iloc[0], df, classification_df
     
     
     def create_statistics(self):
         # create stats excel, and save
         print("---------------------------------")
         print("creating stats excel for everyone")
-        stats_path = os.path.join(self.outputs_path, "stats_excel.xlsx")
 
         if self.run_statistics:
             stat_obj = Statistics()
             self.stats_df = stat_obj.run(self.combined_df)
-
-            self.stats_df["n_sigma"] = self.stats_df.groupby("category")["mean"].transform(lambda x: (x - np.mean(x)) / np.std(x))
-
-            self.export_to_excel(self.stats_df, stats_path)
+            self.export_intermediate(self.stats_df, STATS_NAME)
         else:
-            self.stats_df = self.load_from_excel(stats_path)
+            self.stats_df = self.load_intermediate(STATS_NAME)
     
     
-    def create_word_files(self):
-        start_cadet = self.start_cadet if self.start_task == 'word_build' and self.start_cadet is not None else None
-        
+    def load_old_stats(self):
         # get the old data
         old_stats_df = None
         if self.old_stats_path is not None:
-            old_stats_df = pd.read_excel(self.old_stats_path, header=0, engine="openpyxl")
+            old_stats_df = load_table(self.old_stats_path)
 
+        if self.manifest is not None:
+            # the word files depend only on the values they show, these are for reporting what changed
+            changed = self.manifest.update_inputs("format", file_hash(self.format_path)) + \
+                      self.manifest.update_inputs("old_stats", file_hash(self.old_stats_path))
+            if len(changed) > 0:
+                print(f"changed since the last run: {changed}")
+        return old_stats_df
+    
+    
+    def create_docx_obj(self):
         # save word files
         word_output_dir = os.path.join(self.outputs_path, "word")
         self.ensure_dir(word_output_dir)
+        return self.get_docx_obj()(self.format_path, word_output_dir, cache_histograms=self.cache_histograms)
+    
+    
+    def create_word_files(self):
+        start_cadet = self.start_cadet if self.start_task == 'word_build' and self.start_cadet is not None else None
+        old_stats_df = self.load_old_stats()
 
         print("making word files")
         # create word files
-        docx_obj = self.get_docx_obj()(self.format_path, word_output_dir)
+        docx_obj = self.create_docx_obj()
         docx_obj.run_word_creation(self.combined_df,
                      self.stats_df,
                      name_to_classification=self.name_to_classification,
                      old_stats_df=old_stats_df,
                      start_cadet=start_cadet,
-                     names_to_hashes=self.names_to_hashes)
+                     names_to_hashes=self.names_to_hashes,
+                     sigmas=self.sigmas,
+                     workers=self.workers,
+                     manifest=self.manifest)
     
     
     def save_sigmas(self):
         """
         Save the threshold for large (top 15%) and small (last 15%) sigma values for each category
-        in the column_constants file SIGMAS constant.
+        in self.sigmas (passed to the word files workers), and in sigmas.json of the outputs directory.
+        They are always computed from the stats of this run (also when it starts after the statistics, the stats excel
+        may have been edited since the last run).
         :return: None
         """
-        stats_path = os.path.join(self.outputs_path, "stats_excel.xlsx")
-        stats_df = self.load_from_excel(stats_path)
+        sigmas_path = os.path.join(self.outputs_path, SIGMAS_NAME)
+        if self.stats_df is None:
+            self.stats_df = self.load_intermediate(STATS_NAME)
+        self.sigmas = sigma_thresholds(self.stats_df)
+        with open(sigmas_path, "w", encoding="utf-8") as f:
+            json.dump(self.sigmas, f, ensure_ascii=False, indent=1)
+
+    
+
+    def run_streaming(self):
+        """
+        The same outputs as run, but the statistics are created first, and then every person goes through
+        their excel, classification and word file before the next ones. Only a few persons are in memory at once,
+        and the first word files are ready after the classification of the first STREAM_LOOKAHEAD persons.
+        The word files are created one after the other, --workers is used only for parsing the raters files.
+        """
+        if self.workers > 1:
+            print(f"warning: the word files are created without the {self.workers} workers in the streaming mode,"
+                  f" run without --stream to create them in parallel")
+        self.ensure_dir(self.outputs_path)
+        with profiling.stage("preprocess_and_combine"):
+            self.preprocess_and_combine(split_per_person=False)
+        with profiling.stage("create_statistics"):
+            self.create_statistics()
+        with profiling.stage("save_sigmas"):
+            self.save_sigmas()
 
-        sigmas_df = stats_df.groupby("category")["std"]
-        # cumpute the 85% and 15% quantile for each category and save it in the SIGMAS constant
-        for category, sigma in sigmas_df:
-            SIGMAS[category] = (sigma.quantile(0.15), sigma.quantile(0.85))
+        with profiling.stage("stream_cadets"):
+            self.ensure_dir(self.raw_data_dir_path)
+            classification_model = self.create_classification_model()
+            old_stats_df = self.load_old_stats()
+            docx_obj = self.create_docx_obj()
+            lookup = docx_obj.prepare_word_creation(self.stats_df, old_stats_df=old_stats_df, sigmas=self.sigmas)
 
+            print("making excels, classifications and word files")
+            cadets = self.stream_classifications(classification_model)
+            for _ in tqdm.tqdm(docx_obj.stream_word_creation(cadets, lookup, names_to_hashes=self.names_to_hashes,
+                                                             manifest=self.manifest)):
+                pass
     
+    
+    def run_stages(self):
+        if self.stream:
+            self.run_streaming()
+            return
 
-    def run(self):
         self.ensure_dir(self.outputs_path)
-        self.preprocess_and_combine()
-        self.create_individual_excel()
-        self.create_statistics()
-        self.save_sigmas()
-        self.create_word_files()
+        for stage in (self.preprocess_and_combine, self.create_individual_excel, self.create_statistics,
+                      self.save_sigmas, self.create_word_files):
+            with profiling.stage(stage.__name__):
+                stage()
+    
+    
+    def run(self):
+        if not self.profile:
+            self.run_stages()
+            return
+
+        profiler = profiling.Profiler(use_cprofile=self.profile_cprofile, use_tracemalloc=self.profile_tracemalloc,
+                                      workers=self.workers)
+        try:
+            with profiling.profile_run(profiler):
+                self.run_stages()
+        finally:
+            # saved also when the run fails, to see where it got to
+            self.ensure_dir(self.outputs_path)
+            report_path = os.path.join(self.outputs_path, "profile_report.json")
+            profiler.save(report_path, cprofile_path=os.path.join(self.outputs_path, "profile.prof"))
+            print(f"the profile report was saved to {report_path}")
@@ -1,223 +1,414 @@
-from openpyxl import load_workbook
-from openpyxl.worksheet.worksheet import Worksheet
-from openpyxl.cell.cell import Cell
 import pandas as pd
 
+import hashlib
+import json
 import os
-
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-from time import sleep
-
-
-class smart_wait():
-    def __init__(self, num_batches: int = 10, wait_secs: float = 0.0):
-        self.num_batches = num_batches
-        self.wait_secs = wait_secs
-        self.i = 0
-
-    def __iter__(self):
-        return self
-
-    def __next__(self):
-        self.i += 1
-        if self.i % self.num_batches == 0:
-            sleep(self.wait_secs)
-
-        return
+import re
+
+from llm_client import LLMClient, GeminiBackend, HttpBackend, GEMINI_MODEL_NAME
+from classification_cache import ClassificationCache, normalize_text
+import profiling
+
+TRANSLATION_CONTEXT = "Context: You are a translating chatbot that translates hebrew to english, " + \
+                      "while translating \"מחזור\" to \"year class\" and \"תלפיות\" to \"Talpiot\".\n" + \
+                      "For example: \"אנחנו המחזור הכי טוב בתלפיות\" will be translated to \"We are the best year class in Talpiot\"."
+CLASSIFICATION_CONTEXT = 'Context: You are a classifying chatbot, that can classify to one category out of the following 6 categories (and only them): ' + \
+                         '1. Interpersonal Skills, 2. Intrapersonal Skills, 3. Professionalism, 4. Conduct, 5. Leadership, 6. Other.' + \
+                         'So the only allows answers are: "Interpersonal Skills", "Intrapersonal Skills", "Professionalism", "Conduct", "Leadership", or "Other"' + \
+                         'The "Other" category is user prompts that do not fit very well with any of the categories listed above.'
+
+FUSED_CONTEXT = "Context: You are a chatbot that translates comments on cadets from hebrew to english, " + \
+                "while translating \"מחזור\" to \"year class\" and \"תלפיות\" to \"Talpiot\", " + \
+                "and classifies them to one category out of the following 6 categories (and only them): " + \
+                '1. Interpersonal Skills, 2. Intrapersonal Skills, 3. Professionalism, 4. Conduct, 5. Leadership, 6. Other.' + \
+                'The "Other" category is user prompts that do not fit very well with any of the categories listed above.' + \
+                "Every comment ends with how well its writer knows the cadet (\"רמת היכרות\"), do not translate this part."
+
+# the categories in the order of the classification sheet columns
+CATEGORIES = ["Interpersonal Skills", "Intrapersonal Skills", "Professionalism", "Conduct", "Leadership", "Other"]
+
+TRANSLATION_COLUMNS = ["Original_conserve", "Translation_conserve", "Original_improve", "Translation_improve"]
+CLASSIFICATION_COLUMNS = ["Original_conserve"] + CATEGORIES + ["Original_improve"] + [f"{category}2" for category in CATEGORIES]
+# part of the cache key of the answers, together with the text of the prompts. Bump it when the answers are parsed
+# differently, so the answers cached before are not reused
+PROMPT_VERSION = 1
+# who classified every comment, so the local classifier is trained only on the classifications of the model
+SOURCE_COLUMNS = ["Source_conserve", "Source_improve"]
+SOURCE_LLM = "llm"
+SOURCE_LOCAL = "local"
+
+
+def add_knowing_level(text, knowing):
+    """
+    :param text: a comment on the cadet
+    :param knowing: the answer of the writer for how well he knows the cadet (1-6)
+    :return: the comment, with the knowing level at its end
+    """
+    try:
+        knowing_level = 'גבוהה' if (int(knowing) > 4) else 'נמוכה'
+    except:
+        knowing_level = 'נמוכה'
+    return str(text) + " (רמת היכרות " + knowing_level + "( "
+
+
+def remove_knowing_level(text):
+    # the comment as the rater wrote it, without what add_knowing_level added
+    return re.sub(r" \(רמת היכרות \S+\( $", "", str(text))
+
+
+def find_category(text):
+    """
+    :param text: response of the model
+    :return: the category mentioned in the response (from CATEGORIES), None if there is none
+    """
+    if not isinstance(text, str):
+        return None
+    text = text.lower()
+    # "other" is checked first, as in the answers that mention it with another category it is the real answer
+    for category in ["Other"] + CATEGORIES[:-1]:
+        if category.lower() in text:
+            return category
+    return None
+
+
+def valid_text(text):
+    return text if isinstance(text, str) and text.strip() != "" else None
+
+
+def parse_json(response, open_char, close_char):
+    # the model sometimes wraps the json with text or a code block
+    if not isinstance(response, str):
+        return None
+    start, end = response.find(open_char), response.rfind(close_char)
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(response[start:end + 1])
+    except ValueError:
+        return None
+
+
+def parse_batch_response(response):
+    """
+    Parse the answer of a batch prompt, a json list of {"id": ..., <answer keys>: ...}.
+    :return: dict id -> the object of this id
+    """
+    items = parse_json(response, "[", "]")
+    if not isinstance(items, list):
+        return {}
+
+    answers = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            item_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        answers[item_id] = item
+    return answers
+
+
+def parse_fused_item(item):
+    """
+    :param item: {"translation": ..., "category": ...} answer of the model
+    :return: the answer as a json string (so it can be cached), None if it is not a proper answer
+    """
+    if not isinstance(item, dict):
+        return None
+    translation = valid_text(item.get("translation"))
+    category = find_category(item.get("category"))
+    if translation is None or category is None:
+        return None
+    return json.dumps({"translation": translation, "category": category}, ensure_ascii=False)
 
 
 class classification_model():
-    def __init__(self, excel_dir: str, num_batches: int = 10, wait_secs: float = 0.0):
-        self.smart_wait = iter(smart_wait(num_batches, wait_secs))
-
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_NONE"
-            }
-        ]
-        load_dotenv()
-        GOOGLE_API_KEY = os.environ['GOOGLE_API_KEY']
-        genai.configure(api_key=GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.0-pro', safety_settings=safety_settings)
+    def __init__(self, excel_dir: str, requests_per_minute: float = 60, max_concurrency: int = 8,
+                 llm_url: str = None, batch_size: int = 20, cache_path: str = None, fused: bool = False,
+                 classifier=None, min_confidence: float = 0.6):
+        """
+        :param excel_dir: directory of the cadets excel files
+        :param requests_per_minute: maximal rate of the requests to the model
+        :param max_concurrency: maximal number of requests to the model in flight
+        :param llm_url: url of an http model (for example a local stub server), gemini is used when None
+        :param batch_size: number of comments sent in one prompt, 1 sends a prompt per comment
+        :param cache_path: path of the sqlite cache of the answers, None disables the cache
+        :param fused: translate and classify every comment in the same request
+        :param classifier: local classifier (local_classifier.CommentClassifier) of the comments, the model is used
+                           only for the comments it is not confident about. None sends every comment to the model
+        :param min_confidence: the comments the local classifier is less confident about are sent to the model
+        """
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max_concurrency
+        self.llm_url = llm_url
+        self.batch_size = batch_size
+        # callable prompt -> response text, when None it is created from llm_url (or gemini)
+        self.backend = None
+        self._client = None
+        self.cache = ClassificationCache(cache_path) if cache_path is not None else None
+        # (version, normalized text) -> answer, of the answers of this run. Also without the sqlite cache, the
+        # comments prefetched for many cadets together are answered from here
+        self.run_answers = {}
+        self.fused = fused
+        self.classifier = classifier
+        self.min_confidence = min_confidence
 
         self.excel_dir = excel_dir
-        self.excel_path = None
-        self.book = None
-
-        self.sheet = None
 
-        self.translation_sheet: Worksheet = None
-        self.classification_sheet = None
+    @property
+    def client(self):
+        # created on the first request, so runs without classification do not need the api key
+        if self._client is None:
+            backend = self.backend
+            if backend is None:
+                backend = HttpBackend(self.llm_url) if self.llm_url is not None else GeminiBackend()
+            self._client = LLMClient(backend, requests_per_minute=self.requests_per_minute,
+                                     max_concurrency=self.max_concurrency)
+        return self._client
 
     def generate_response(self, prompt: str, original_text):
-        next(self.smart_wait)
-        response = self.model.generate_content(prompt)
-        tries = 0
-        while tries < 3:
-            if response != None:
-                if hasattr(response, "text"):
-                    print(response.text)
-                    return response.text
-
-            print(f"{original_text} failed in {tries + 1} iteration to prompt")
-            print(f"reason is:\n{response}\n")
-            tries += 1
-        print(response)
+        response = self.client.generate(prompt)
+        if response is None:
+            print(f"{original_text} failed to prompt")
+        else:
+            print(response)
         return response
 
-    def translate_sheet(self):
-        # this function translates a person's good and bad comments (one sheet) from hebrew to english
-        base_st = "Context: You are a translating chatbot that translates hebrew to english, "
-        base_st += "while translating \"מחזור\" to \"year class\" and \"תלפיות\" to \"Talpiot\".\n"
-        base_st += "For example: \"אנחנו המחזור הכי טוב בתלפיות\" will be translated to \"We are the best year class in Talpiot\"."
-        base_st += "Your response should only include the translation.\n"
-        base_st += "User prompt: \""
-
-        if "Translation" in self.book.sheetnames:
-            self.book.remove(self.book["Translation"])
-        self.translation_sheet = self.book.create_sheet("Translation")
-
-        self.translation_sheet['A1'].value, self.translation_sheet[
-            'B1'].value = "Original_conserve", "Translation_conserve"
-        self.translation_sheet['C1'].value, self.translation_sheet[
-            'D1'].value = "Original_improve", "Translation_improve"
-
-        row_fixer = 0
-        for i, sentence in enumerate(self.sheet['Q'][1:] + self.sheet['R'][1:]):
-            sentence: Cell = sentence
-            text = sentence.value
-            if sentence.row - row_fixer <= 1:
-                row_fixer = 0
-
-            if text is None:
-                row_fixer += 1
-                continue
-
-            # TODO - add knowing level
-            try:
-                knowing_level = 'גבוהה' if (int(self.sheet['B'][sentence.row - 1].value) > 4) else 'נמוכה'
-            except:
-                knowing_level = 'נמוכה'
-
-            st = f"{base_st}{text}\""
-
-            original_col = 'A' if sentence.column == 17 else 'C'
-            translation_col = 'B' if sentence.column == 17 else 'D'
-            updated_text = str(text) + " (רמת היכרות " + knowing_level + "( "
-            self.translation_sheet[f"{original_col}{sentence.row - row_fixer}"].value = updated_text
-
-            self.translation_sheet[f"{translation_col}{sentence.row - row_fixer}"].value = self.generate_response(st,
-                                                                                                                  text)
-
-        self.book.save(self.excel_path)
-
-    def set_classifications(self, is_improve: bool, row: int, text: str):
-        text = text.lower()
-
-        base_col_ascii = ord('I') if is_improve else ord('B')
-
-        if "other" in text:
-            self.classification_sheet[f'{chr(base_col_ascii + 5)}{row}'].value = "TRUE"
-            return
-
-        if "interpersonal skills" in text:
-            self.classification_sheet[f'{chr(base_col_ascii)}{row}'].value = "TRUE"
-            return
-
-        if "intrapersonal skills" in text:
-            self.classification_sheet[f'{chr(base_col_ascii + 1)}{row}'].value = "TRUE"
-            return
-
-        if "professionalism" in text:
-            self.classification_sheet[f'{chr(base_col_ascii + 2)}{row}'].value = "TRUE"
-            return
-
-        if "conduct" in text:
-            self.classification_sheet[f'{chr(base_col_ascii + 3)}{row}'].value = "TRUE"
-            return
-
-        if "leadership" in text:
-            self.classification_sheet[f'{chr(base_col_ascii + 4)}{row}'].value = "TRUE"
-            return
-
-    def classify_sheet(self):
-        base_st = 'Context: You are a classifying chatbot, that can classify to one category out of the following 6 categories (and only them): ' + \
-                  '1. Interpersonal Skills, 2. Intrapersonal Skills, 3. Professionalism, 4. Conduct, 5. Leadership, 6. Other.' + \
-                  'So the only allows answers are: "Interpersonal Skills", "Intrapersonal Skills", "Professionalism", "Conduct", "Leadership", or "Other"' + \
-                  'The "Other" category is user prompts that do not fit very well with any of the categories listed above.' + \
-                  f'User prompt: "'
-
-        if "Classification" in self.book.sheetnames:
-            self.book.remove(self.book["Classification"])
-        self.classification_sheet = self.book.create_sheet("Classification")
-
-        self.classification_sheet['A1'].value = "Original_conserve"
-        self.classification_sheet['B1'].value = "Interpersonal Skills"
-        self.classification_sheet['C1'].value = "Intrapersonal Skills"
-        self.classification_sheet['D1'].value = "Professionalism"
-        self.classification_sheet['E1'].value = "Conduct"
-        self.classification_sheet['F1'].value = "Leadership"
-        self.classification_sheet['G1'].value = "Other"
-
-        self.classification_sheet['H1'].value = "Original_improve"
-        self.classification_sheet['I1'].value = "Interpersonal Skills2"
-        self.classification_sheet['J1'].value = "Intrapersonal Skills2"
-        self.classification_sheet['K1'].value = "Professionalism2"
-        self.classification_sheet['L1'].value = "Conduct2"
-        self.classification_sheet['M1'].value = "Leadership2"
-        self.classification_sheet['N1'].value = "Other2"
-
-        for i in range(2, self.translation_sheet.max_row + 1):
-            self.classification_sheet[f"A{i}"].value = self.translation_sheet[f"A{i}"].value
-            self.classification_sheet[f"H{i}"].value = self.translation_sheet[f"C{i}"].value
-
-            translated_sentence = self.translation_sheet[f"B{i}"].value
-            if translated_sentence is not None:
-                st = f"{base_st}{translated_sentence}\""
-                self.set_classifications(False, i, self.generate_response(st, translated_sentence))
-
-            translated_sentence = self.translation_sheet[f"D{i}"].value
-            if translated_sentence is not None:
-                st = f"{base_st}{translated_sentence}\""
-                self.set_classifications(True, i, self.generate_response(st, translated_sentence))
-
-        self.book.save(self.excel_path)
-
-    def run_classification_for_cadet(self, excel_filename: str, excel_sheet: str = None, run_translation: bool = True,
-                                     run_classification: bool = True, return_if_classified: bool = True):
-        self.excel_path = os.path.join(self.excel_dir, excel_filename)
-        self.book = load_workbook(self.excel_path)
-
-        if not return_if_classified:
-            if "Classification" in self.book.sheetnames:
-                return pd.read_excel(self.excel_path, sheet_name="Classification", engine='openpyxl', header=0)
+    def generate_responses(self, prompts, original_texts):
+        # all of the prompts are sent concurrently, the responses are in the order of the prompts
+        responses = self.client.generate_many(prompts)
+        for response, original_text in zip(responses, original_texts):
+            if response is None:
+                print(f"{original_text} failed to prompt")
             else:
-                return None
-
-        if excel_sheet is not None:
-            self.sheet = self.book[excel_sheet]
+                print(response)
+        return responses
+
+    def batch_prompt(self, context: str, keys, texts):
+        items = [{"id": i + 1, "text": str(text)} for i, text in enumerate(texts)]
+        keys_text = " and ".join(f"\"{key}\"" for key in keys)
+        return f"{context}\n" + \
+               f"Answer for every one of the following user prompts separately. Your response should only include " + \
+               f"a JSON list with an object for each user prompt, with the key \"id\" (the id of the user prompt) " + \
+               f"and the keys {keys_text} (the answer for it).\n" + \
+               f"User prompts (JSON): {json.dumps(items, ensure_ascii=False)}"
+
+    def run_batched(self, texts, context: str, keys, single_prompt, parse_item, parse_single):
+        """
+        Send the texts in batch prompts, and every text that was not answered properly in a single prompt.
+        :param keys: the keys of the answer in the objects of the batch answer
+        :param single_prompt: function text -> the prompt of this text alone
+        :param parse_item: function object of a batch answer -> the answer (None when it can not be used)
+        :param parse_single: function response of a single prompt -> the answer (None when it can not be used)
+        :return: the answers, in the order of the texts (None for texts that failed)
+        """
+        results = [None] * len(texts)
+
+        if self.batch_size > 1 and len(texts) > 1:
+            chunks = [range(start, min(start + self.batch_size, len(texts)))
+                      for start in range(0, len(texts), self.batch_size)]
+            prompts = [self.batch_prompt(context, keys, [texts[i] for i in chunk]) for chunk in chunks]
+            profiling.count("llm_batch_prompts", len(prompts))
+            for chunk, response in zip(chunks, self.client.generate_many(prompts)):
+                answers = parse_batch_response(response)
+                for item_id, i in enumerate(chunk, start=1):
+                    results[i] = parse_item(answers.get(item_id))
+
+        # partial or misaligned batch answers, fall back to a prompt per text
+        missing = [i for i in range(len(texts)) if results[i] is None]
+        if len(missing) > 0:
+            profiling.count("llm_single_prompts", len(missing))
+            responses = self.generate_responses([single_prompt(texts[i]) for i in missing], [texts[i] for i in missing])
+            for i, response in zip(missing, responses):
+                results[i] = parse_single(response)
+
+        return results
+
+    def prompt_version(self, kind: str, context: str, keys, single_prompt):
+        """
+        Answers of another prompt or another model are not reused: the version is a hash of the model, of the
+        templates of the batch prompt and of the single prompt, and of PROMPT_VERSION.
+        :param keys: the keys of the answer in the objects of the batch answer
+        :param single_prompt: function text -> the prompt of this text alone
+        """
+        model_name = self.llm_url if self.llm_url is not None else GEMINI_MODEL_NAME
+        templates = [self.batch_prompt(context, keys, ["{text}"]), single_prompt("{text}")]
+        version_text = "\0".join([kind, str(PROMPT_VERSION), model_name] + templates)
+        return hashlib.sha256(version_text.encode("utf-8")).hexdigest()[:16]
+
+    def run_cached(self, kind: str, context: str, keys, single_prompt, texts, compute):
+        """
+        Answer every distinct text only once, from the answers of this run or from the cache when it was already
+        answered.
+        :param keys: the keys of the answer in the objects of the batch answer
+        :param single_prompt: function text -> the prompt of this text alone
+        :param compute: function list of texts -> their answers, for the texts that are not in the cache
+        :return: the answers, in the order of the texts
+        """
+        version = self.prompt_version(kind, context, keys, single_prompt)
+
+        # the first text of every normalized text is the one sent to the model
+        unique = {}
+        for text in texts:
+            unique.setdefault(normalize_text(text), text)
+
+        answers = {normalized: self.run_answers[(version, normalized)] for normalized in unique
+                   if (version, normalized) in self.run_answers}
+        if self.cache is not None:
+            not_answered = [text for normalized, text in unique.items() if normalized not in answers]
+            for text, answer in self.cache.get_many(version, not_answered).items():
+                answers[normalize_text(text)] = answer
+
+        missing = [text for normalized, text in unique.items() if normalized not in answers]
+        if len(missing) > 0:
+            new_answers = {text: answer for text, answer in zip(missing, compute(missing)) if answer is not None}
+            for text, answer in new_answers.items():
+                answers[normalize_text(text)] = answer
+            if self.cache is not None:
+                self.cache.put_many(version, new_answers)
+
+        for normalized, answer in answers.items():
+            self.run_answers[(version, normalized)] = answer
+
+        return [answers.get(normalize_text(text)) for text in texts]
+
+    def prefetch(self, texts, knowing_values):
+        """
+        Translate and classify the comments of many cadets together (each distinct comment once, in batch prompts),
+        so the runs of the cadets are served from the answers of this run.
+        :param texts: hebrew comments
+        :param knowing_values: for every comment, how well its writer knows the cadet
+        """
+        self.translate_and_classify_comments([(text, add_knowing_level(text, knowing))
+                                              for text, knowing in zip(texts, knowing_values)])
+
+    def translate_texts(self, texts):
+        """
+        :param texts: hebrew comments (of any cadets)
+        :return: the english translations, in the order of the texts
+        """
+        single_prompt = lambda text: f"{TRANSLATION_CONTEXT}Your response should only include the translation.\n" + \
+                                     f"User prompt: \"{text}\""
+        return self.run_cached("translation", TRANSLATION_CONTEXT, ["translation"], single_prompt, texts,
+                               lambda missing: self.run_batched(missing, TRANSLATION_CONTEXT, ["translation"],
+                                                                single_prompt,
+                                                                lambda item: valid_text((item or {}).get("translation")),
+                                                                valid_text))
+
+    def classify_texts(self, texts):
+        """
+        :param texts: english comments (of any cadets)
+        :return: the answers of the model, each one mentions one of CATEGORIES (None when it failed)
+        """
+        single_prompt = lambda text: f"{CLASSIFICATION_CONTEXT}User prompt: \"{text}\""
+        parse_single = lambda answer: answer if find_category(answer) is not None else None
+        return self.run_cached("category", CLASSIFICATION_CONTEXT, ["category"], single_prompt, texts,
+                               lambda missing: self.run_batched(missing, CLASSIFICATION_CONTEXT, ["category"],
+                                                                single_prompt,
+                                                                lambda item: parse_single((item or {}).get("category")),
+                                                                parse_single))
+
+    def translate_and_classify_texts(self, texts):
+        """
+        Translate and classify every comment in one request (fused mode).
+        :param texts: hebrew comments, with their knowing level (add_knowing_level)
+        :return: (translation, category) of every text, None when it failed
+        """
+        single_prompt = lambda text: f"{FUSED_CONTEXT}Your response should only include a JSON object with the " + \
+                                     f"keys \"translation\" and \"category\".\nUser prompt: \"{text}\""
+        answers = self.run_cached("fused", FUSED_CONTEXT, ["translation", "category"], single_prompt, texts,
+                                  lambda missing: self.run_batched(missing, FUSED_CONTEXT, ["translation", "category"],
+                                                                   single_prompt, parse_fused_item,
+                                                                   lambda response: parse_fused_item(
+                                                                       parse_json(response, "{", "}"))))
+        results = []
+        for answer in answers:
+            if answer is None:
+                results.append(None)
+            else:
+                answer = json.loads(answer)
+                results.append((answer["translation"], answer["category"]))
+        return results
+
+    def translate_and_classify_comments(self, comments):
+        """
+        :param comments: list of (comment, comment with its knowing level)
+        :return: (translation, category, source) of every comment, None instead of what failed
+                 (the comments classified by the local classifier are not translated), the source is SOURCE_LOCAL
+                 or SOURCE_LLM (None when there is no category)
+        """
+        if self.classifier is None:
+            return self.model_translate_and_classify(comments)
+
+        answers = [(None, category, SOURCE_LOCAL) if confidence >= self.min_confidence else None
+                   for category, confidence in self.classifier.classify([text for text, updated_text in comments])]
+        uncertain = [i for i, answer in enumerate(answers) if answer is None]
+        if len(uncertain) > 0:
+            for i, answer in zip(uncertain, self.model_translate_and_classify([comments[i] for i in uncertain])):
+                answers[i] = answer
+        return answers
+
+    def model_translate_and_classify(self, comments):
+        # the same as translate_and_classify_comments, all of the comments are sent to the model
+        if self.fused:
+            answers = self.translate_and_classify_texts([updated_text for text, updated_text in comments])
+            answers = [answer if answer is not None else (None, None) for answer in answers]
         else:
-            self.sheet = self.book.active
-
-        if run_translation:
-            self.translate_sheet()
-
-        if run_classification:
-            self.classify_sheet()
-
-        return pd.read_excel(self.excel_path, sheet_name="Classification", engine='openpyxl', header=0)
+            translations = self.translate_texts([text for text, updated_text in comments])
+            responses = iter(self.classify_texts([translation for translation in translations
+                                                  if translation is not None]))
+            answers = [(translation, find_category(next(responses)) if translation is not None else None)
+                       for translation in translations]
+        return [(translation, category, SOURCE_LLM if category is not None else None)
+                for translation, category in answers]
+
+    def run_classification_for_cadet(self, person_df: pd.DataFrame):
+        """
+        Translate and classify the comments a person got, in memory.
+        :param person_df: the data of the person, a row for each rater (the second column is how well the rater
+                          knows the person, the last two columns are the points to conserve and to improve)
+        :return: (translation_df, classification_df) - the comments (with their knowing level) and their translation,
+                 and the comments with True under their category and who classified them under Source
+        """
+        knowing_col = person_df.columns[1]
+        # (is_improve, comment, comment with its knowing level), all of the comments are sent together
+        comments = []
+        for is_improve, col in ((False, person_df.columns[-2]), (True, person_df.columns[-1])):
+            has_comment = person_df[col].notna()
+            for text, knowing in zip(person_df.loc[has_comment, col], person_df.loc[has_comment, knowing_col]):
+                comments.append((is_improve, text, add_knowing_level(text, knowing)))
+
+        # the comments of each kind are one after the other, from the first row
+        num_rows = max([sum(1 for comment in comments if comment[0] == is_improve) for is_improve in (False, True)])
+        translation_df = pd.DataFrame(index=range(num_rows), columns=TRANSLATION_COLUMNS, dtype=object)
+        classification_df = pd.DataFrame(index=range(num_rows), columns=CLASSIFICATION_COLUMNS + SOURCE_COLUMNS,
+                                         dtype=object)
+
+        answers = self.translate_and_classify_comments([(text, updated_text) for _, text, updated_text in comments])
+        next_row = {False: 0, True: 0}
+        for (is_improve, text, updated_text), (translation, category, source) in zip(comments, answers):
+            kind = "improve" if is_improve else "conserve"
+            row = next_row[is_improve]
+            next_row[is_improve] += 1
+
+            translation_df.at[row, f"Original_{kind}"] = updated_text
+            translation_df.at[row, f"Translation_{kind}"] = translation
+            classification_df.at[row, f"Original_{kind}"] = updated_text
+            if category is not None:
+                classification_df.at[row, category + ("2" if is_improve else "")] = True
+                classification_df.at[row, f"Source_{kind}"] = source
+
+        return translation_df, classification_df
+
+    def load_classification(self, excel_filename: str):
+        """
+        :return: the Classification sheet saved in the excel of the person, None if it was not classified
+        """
+        excel_path = os.path.join(self.excel_dir, excel_filename)
+        if not os.path.isfile(excel_path):
+            return None
+        with pd.ExcelFile(excel_path, engine='openpyxl') as excel:
+            if "Classification" not in excel.sheet_names:
+                return None
+            return pd.read_excel(excel, sheet_name="Classification", header=0, dtype=object)
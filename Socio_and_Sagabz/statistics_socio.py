@@ -2,33 +2,67 @@ from abc import ABC
 import pandas as pd
 import numpy as np
 
+
+def is_number(x):
+    return isinstance(x, (int, np.int64, float, np.float64))
+
+
+def positive_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce the columns to floats, every non numeric (text) and non positive value becomes NaN.
+    :param df: dataframe of the raters answers (without the name column)
+    :return: float dataframe with the same index and columns
+    """
+    numeric = {}
+    for category in df.columns:
+        col = df[category]
+        if not pd.api.types.is_numeric_dtype(col):
+            # text answers are not numbers, even if they look like one
+            col = pd.to_numeric(col.where(col.map(is_number)), errors="coerce")
+        numeric[category] = col.astype(float)
+    numeric = pd.DataFrame(numeric, index=df.index)
+    return numeric.where(numeric > 0)
+
+
+def sigma_thresholds(stats_df: pd.DataFrame, small: float = 0.15, big: float = 0.85) -> dict:
+    """
+    The thresholds for small (last 15%) and large (top 15%) sigma values of each category.
+    :param stats_df: the result of Statistics.run
+    :return: category -> (small threshold, big threshold)
+    """
+    quantiles = stats_df.groupby("category")["std"].quantile([small, big]).unstack()
+    return {category: (float(small_threshold), float(big_threshold))
+            for category, small_threshold, big_threshold in zip(quantiles.index, quantiles[small], quantiles[big])}
+
+
 class Statistics(ABC):
     def __init__(self):
         pass
 
     def run(self, combined_data: pd.DataFrame):
-        combined_data = combined_data.copy()
         # delete points to improve and points to conserve
         combined_data = combined_data.drop(columns=combined_data.columns[-2:])
 
-        rows = []
-
-        for df in combined_data.groupby("name"):
-            person_name = df[0]
-            df = df[1]
-            columns = df.columns
-            columns = columns.drop("name")
-            for category in columns:
-                col = df[category]
-                # remove from col every non numeric value row
-                col = col[col.apply(lambda x: isinstance(x, (int, np.int64, float, np.float64)))]
-                col = col[col.apply(lambda x: x > 0)]
-
-                mean = round(col.mean(), 2)
-                std = round(col.std(), 2)
-                row = [person_name, category, mean, std]
-                rows.append(row)
-
-        # what if I want to get more data, not open/close!!
-        ret_val = pd.DataFrame(rows, columns=["name", "category", "mean", "std"])
-        return ret_val
\ No newline at end of file
+        values = positive_values(combined_data.drop(columns="name"))
+        categories = values.columns
+        grouped = values.groupby(combined_data["name"])
+
+        means = grouped.mean().round(2)
+        stds = grouped.std().round(2)
+        counts = grouped.count()
+
+        # long format - a row for every (name, category), ordered by name and then by category
+        names = means.index
+        ret_val = pd.DataFrame({"name": np.repeat(names.to_numpy(), len(categories)),
+                                "category": np.tile(categories.to_numpy(), len(names)),
+                                "mean": means.to_numpy().ravel(),
+                                "std": stds.to_numpy().ravel()})
+
+        # how far is the mean of the person from the others (in std units) in each category
+        mean_by_category = ret_val.groupby("category")["mean"]
+        ret_val["n_sigma"] = (ret_val["mean"] - mean_by_category.transform("mean")) / \
+                             mean_by_category.transform("std", ddof=0)
+
+        # number of non zero answers of the person in the category
+        ret_val["N"] = counts.to_numpy().ravel()
+        return ret_val
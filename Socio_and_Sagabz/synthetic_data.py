@@ -0,0 +1,99 @@
+#!/usr/bin/python
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from column_constants import MASHOV_SAGZAB, SOCIOMETRY
+
+# words of the synthetic comments
+COMMENT_WORDS = ["מקצועי", "אחראי", "מנהיג", "חברותי", "יסודי", "עוזר", "לצוות", "במשימות", "ביוזמה", "בלימודים",
+                 "מאוד", "תמיד", "לפעמים", "צריך", "לשפר", "את", "ההקשבה", "הסדר", "הזמנים", "בהצגת", "רעיונות",
+                 "מחזור", "תלפיות", "בשיחות", "אישיות", "ומשמעת", "טוב", "מצוין", "עם", "כולם"]
+# the first row of a socio rater file is the average of the rater, the pre processing removes it
+SOCIO_AVERAGE_ROW_NAME = "ממוצע"
+
+
+def synthetic_comment(rng, comment_words):
+    """
+    :param comment_words: (min, max) number of words of the comment
+    """
+    num_words = rng.integers(comment_words[0], comment_words[1] + 1)
+    return " ".join(rng.choice(COMMENT_WORDS, size=num_words))
+
+
+def synthetic_rater_df(rng, cadet_names, is_socio=True, comment_words=(3, 15), comment_rate=0.7,
+                       missing_rate=0.03):
+    """
+    The answers of one rater about the cadets, in the layout of the raters excel files
+    (the columns are in the order of SOCIOMETRY / MASHOV_SAGZAB, the pre processing renames them).
+    :param comment_rate: probability of a rater to write each one of the comments
+    :param missing_rate: probability of a rating to be 0 (does not know)
+    """
+    columns = SOCIOMETRY if is_socio else MASHOV_SAGZAB
+    num_cadets = len(cadet_names)
+    data = {columns[0]: list(cadet_names)}
+
+    # the rating columns, between the name and the general / comments columns
+    rating_columns = columns[1:-3] if is_socio else columns[1:-2]
+    for i, column in enumerate(rating_columns):
+        # the values categories of the socio (the last 6 ratings) are 0-3, the rest are 1-6
+        is_values = is_socio and i >= len(rating_columns) - 6
+        ratings = rng.integers(1, 4 if is_values else 7, num_cadets).astype(object)
+        ratings[rng.random(num_cadets) < missing_rate] = 0
+        data[column] = ratings
+
+    if is_socio:
+        # the general rating is shown as a sentence of its rounded value, so it is always 1-6
+        data[columns[-3]] = rng.integers(1, 7, num_cadets)
+
+    for column in columns[-2:]:
+        data[column] = [synthetic_comment(rng, comment_words) if rng.random() < comment_rate else None
+                        for _ in range(num_cadets)]
+
+    df = pd.DataFrame(data)
+    if is_socio:
+        df = pd.concat([pd.DataFrame([{columns[0]: SOCIO_AVERAGE_ROW_NAME}]), df], ignore_index=True)
+    return df
+
+
+def generate_cohort(output_dir, num_cadets=50, num_raters=20, is_socio=True, comment_words=(3, 15),
+                    comment_rate=0.7, seed=0):
+    """
+    Write synthetic raters excel files, a file per rater with a row for every cadet.
+    :param output_dir: directory of the raters excel files (the --raw-data-path of main.py)
+    :param comment_words: (min, max) number of words of every comment
+    :return: list of the paths of the written files
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    rng = np.random.default_rng(seed)
+    cadet_names = [f"צוער {i}" for i in range(num_cadets)]
+
+    paths = []
+    for rater in range(num_raters):
+        df = synthetic_rater_df(rng, cadet_names, is_socio=is_socio, comment_words=comment_words,
+                                comment_rate=comment_rate)
+        path = os.path.join(output_dir, f"rater {rater}.xlsx")
+        df.to_excel(path, index=False)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="write synthetic raters excel files, for benchmarks and tests")
+    parser.add_argument('output_dir', type=str, help="directory of the raters excel files.")
+    parser.add_argument('--cadets', type=int, default=50, help="number of cadets.")
+    parser.add_argument('--raters', type=int, default=20, help="number of raters (excel files).")
+    parser.add_argument('--sagabz', action='store_true', default=False,
+                        help="write the sagabz layout instead of the socio layout.")
+    parser.add_argument('--comment-words', type=int, nargs=2, default=[3, 15],
+                        help="minimal and maximal number of words of a comment.")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random values.")
+    args = parser.parse_args()
+
+    paths = generate_cohort(args.output_dir, num_cadets=args.cadets, num_raters=args.raters,
+                            is_socio=not args.sagabz, comment_words=tuple(args.comment_words), seed=args.seed)
+    print(f"wrote {len(paths)} raters files to {args.output_dir}")
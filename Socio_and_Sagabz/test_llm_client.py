@@ -0,0 +1,54 @@
+import unittest
+from time import monotonic
+
+from llm_client import HttpBackend, LLMClient, TokenBucket
+from llm_stub_server import StubServer
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_rate(self):
+        bucket = TokenBucket(requests_per_minute=1200, burst=2)
+        start = monotonic()
+        for _ in range(12):
+            bucket.acquire()
+        # the burst is taken at once, the other 10 tokens are refilled at 20 per second
+        self.assertGreaterEqual(monotonic() - start, 0.45)
+
+
+class LLMClientStubServerTest(unittest.TestCase):
+    def client(self, server, requests_per_minute=6000, max_concurrency=4):
+        return LLMClient(HttpBackend(server.url, timeout=5), requests_per_minute=requests_per_minute,
+                         max_concurrency=max_concurrency, max_retries=5, backoff_secs=0.01, max_backoff_secs=0.05)
+
+    def test_order_and_retries(self):
+        prompts = [f"prompt {i}" for i in range(20)]
+        with StubServer(latency_secs=0.02, rate_limit_every=3) as server:
+            client = self.client(server)
+            responses = client.generate_many(prompts)
+
+        self.assertEqual(responses, prompts)
+        statuses = [status for _, _, status in server.requests]
+        # every 429 was retried until the prompt was answered
+        self.assertEqual(statuses.count(200), len(prompts))
+        self.assertEqual(statuses.count(429), len(statuses) // 3)
+        self.assertEqual(client.num_calls, len(statuses))
+        self.assertEqual(sorted(prompt for _, prompt, status in server.requests if status == 200), sorted(prompts))
+
+    def test_request_rate(self):
+        requests_per_minute, max_concurrency = 600, 2
+        with StubServer(latency_secs=0.01) as server:
+            self.client(server, requests_per_minute, max_concurrency).generate_many([str(i) for i in range(12)])
+
+        times = [time for time, _, _ in server.requests]
+        # after the burst of max_concurrency requests, 10 requests per second
+        self.assertGreaterEqual(times[-1] - times[0], (len(times) - max_concurrency) / 10 - 0.1)
+
+    def test_empty_response_is_not_retried(self):
+        with StubServer(answer=lambda prompt: None) as server:
+            client = self.client(server)
+            self.assertIsNone(client.generate("blocked"))
+        self.assertEqual(len(server.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
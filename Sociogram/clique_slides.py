@@ -7,11 +7,12 @@ from matplotlib.gridspec import GridSpec
 from typing import List, Dict, Tuple, Any, Set, Union
 
 from Sociogram import main_sociogram
+from Sociogram.sociogram_graph import SociogramGraph
 
 
 class CliqueSlides:
 
-    def __init__(self, graph: nx.DiGraph, identifier_to_features: Dict[str, List[str]],
+    def __init__(self, graph: SociogramGraph, identifier_to_features: Dict[str, List[str]],
                  identifier_to_name: Dict[str, str]):
         """
         Initialize CliqueSlides instance.
@@ -33,16 +34,14 @@ class CliqueSlides:
 
     def find_cliques_with_limit(self) -> tuple[list[Union[list[Any], Any]], set[Any]]:
         """
-        Find cliques in the graph. The cliques are found usign the built-in find_cliques method of the networkx library
-        and then sorted by their size (and by lexical order, for the algorithm to be deterministic). The cliques are
+        Find cliques in the graph. The cliques are found using the Bron-Kerbosch algorithm (like the find_cliques method
+        of the networkx library) and then sorted by their size (and by lexical order, for the algorithm to be deterministic). The cliques are
         then iterated over, and overlapping nodes between cliques are removed so that the cliques have unique nodes.
 
         :return: A tuple containing non-overlapping cliques and remaining vertices.
         """
-        graph = self.graph.to_undirected()
-
         # Find all cliques in the graph
-        all_cliques = sorted(list(nx.find_cliques(graph)), key=len, reverse=True)
+        all_cliques = sorted(self.graph.maximal_cliques(), key=len, reverse=True)
         # Sort each clique internally by lexical order
         all_cliques = [sorted(clique) for clique in all_cliques]
         # Sort all cliques by their length and lexical order
@@ -81,7 +80,7 @@ class CliqueSlides:
                     if self.max_num_cliques != -1 and len(non_overlapping_cliques) >= self.max_num_cliques:
                         break
 
-        remaining_vertices = set(graph.nodes()) - nodes_covered
+        remaining_vertices = set(self.graph.identifiers) - nodes_covered
         return non_overlapping_cliques, remaining_vertices
 
     def assign_remaining_nodes_to_cliques(self, non_overlapping_cliques: List[List[str]], remaining_nodes: set[str]) -> \
@@ -107,17 +106,17 @@ class CliqueSlides:
             for node in remaining_nodes:
                 max_edges = 0
                 closest_clique_index = -1
-                node_edges_count = len(self.graph.in_edges(node)) + len(self.graph.out_edges(node))
+                node_id = self.graph.identifier_to_id[node]
+                node_edges_count = self.graph.in_degree[node_id] + self.graph.out_degree[node_id]
+                neighbors = set(self.graph.identifiers_of(self.graph.neighbors(node_id)))
 
                 for i in range(len(non_overlapping_cliques)):
                     clique = non_overlapping_cliques[i] + second_order_nodes[i]
                     if len(clique) > self.max_clique_size:
                         continue
                     # Count the number of edges between the node and members of the clique
-                    edges_to_clique = sum(1 for member in clique if
-                                          (node, member) in self.graph.edges() or (member, node) in self.graph.edges())
-                    edges_from_clique = sum(1 for member in clique if (member, node) in self.graph.edges() or (
-                        node, member) in self.graph.edges())
+                    edges_to_clique = sum(1 for member in clique if member in neighbors)
+                    edges_from_clique = sum(1 for member in clique if member in neighbors)
                     total_edges = (edges_to_clique + edges_from_clique) * average_clique_size / len(clique)
 
                     # Update the closest clique if the current clique has more edges
@@ -157,7 +156,7 @@ class CliqueSlides:
         # Add original nodes of the clique
         gs = GridSpec(1, 2, width_ratios=[3, 1])  # Adjust the height ratios as needed
         fig = plt.figure(figsize=(12, 8))
-        g = self.graph.subgraph(cliques[index] + second_order_nodes[index])
+        g = self.graph.to_networkx().subgraph(cliques[index] + second_order_nodes[index])
 
         ax = [fig.add_subplot(gs[0]), fig.add_subplot(gs[1])]
         ax[1].text(0, .4, self.characterize_group(cliques[index] + second_order_nodes[index]))
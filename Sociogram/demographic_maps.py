@@ -5,13 +5,14 @@ import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
 import numpy as np
 from Sociogram import main_sociogram
+from Sociogram.sociogram_graph import SociogramGraph
 
-def draw_social_map(graph, identifier_to_name, identifier_to_features, attribute='נקבה'):
+def draw_social_map(graph: SociogramGraph, identifier_to_name, identifier_to_features, attribute='נקבה'):
     """
     Draw the social map of the cadets that includes the specified attribute in their features.
 
     Parameters:
-    - graph (nx.DiGraph): The directed graph of social connections.
+    - graph (SociogramGraph): The directed graph of social connections.
     - identifier_to_name (dict): Dictionary mapping identifiers to cadet names.
     - identifier_to_features (dict): Dictionary mapping identifiers to their features (list).
     - attribute (str): The attribute based on which to color nodes.
@@ -25,39 +26,40 @@ def draw_social_map(graph, identifier_to_name, identifier_to_features, attribute
     flipped_node_names = {k: v[::-1] for k, v in identifier_to_name.items()}
     plt.figure(figsize=(20, 20))
 
-    # Modify the graph to add weights
-    for u, v in graph.edges():
-        if attribute in identifier_to_features[u] and attribute in identifier_to_features[v]:
-            # Increase weight for edges where both nodes have the attribute
-            graph[u][v]['weight'] = 10
-        elif attribute in identifier_to_features[u] or attribute in identifier_to_features[v]:
-            graph[u][v]['weight'] = 5
-        else:
-            graph[u][v]['weight'] = 1  # Normal weight for other edges
+    # Classify the edges by the attribute of their nodes
+    has_attribute = np.array([attribute in identifier_to_features[identifier] for identifier in graph.identifiers],
+                             dtype=bool)
+    attribute_nodes = graph.identifiers_of(np.flatnonzero(has_attribute))
+    both_have_attribute = has_attribute[graph.sources] & has_attribute[graph.targets]
+    one_has_attribute = has_attribute[graph.sources] | has_attribute[graph.targets]
+
+    # Increase weight for edges where both nodes have the attribute, normal weight for other edges
+    weights = np.where(both_have_attribute, 10, np.where(one_has_attribute, 5, 1))
+    weighted_graph = graph.to_networkx(weights=weights)
 
     # Compute the position of nodes using the spring layout with weighted edges
-    pos = nx.spring_layout(graph, weight='weight', iterations=200, k=3, seed=10)  # The layout uses the edge weights
+    pos = nx.spring_layout(weighted_graph, weight='weight', iterations=200, k=3, seed=10)  # The layout uses the edge weights
 
 
     # Determine the color of nodes based on the attribute
-    colors = ['red' if attribute in identifier_to_features[identifier] else 'gray' for identifier in graph.nodes()]
+    colors = ['red' if node_has_attribute else 'gray' for node_has_attribute in has_attribute]
 
     # Draw nodes
-    nx.draw_networkx_nodes(graph, pos, node_color=colors, node_size=2000)
+    nx.draw_networkx_nodes(weighted_graph, pos, node_color=colors, node_size=2000)
     # Draw labels
-    nx.draw_networkx_labels(graph, pos, labels=flipped_node_names, font_size=10, font_weight='bold')
+    nx.draw_networkx_labels(weighted_graph, pos, labels=flipped_node_names, font_size=10, font_weight='bold')
 
     # Draw edges differently based on attribute presence
-    edges_with_both_attributes = [(u, v) for u, v in graph.edges() if
-                                  attribute in identifier_to_features[u] and attribute in identifier_to_features[v]]
-    edges_with_attribute = [(u, v) for u, v in graph.edges() if
-                            attribute in identifier_to_features[u] or attribute in identifier_to_features[v]]
+    edges_with_both_attributes = list(zip(graph.identifiers_of(graph.sources[both_have_attribute]),
+                                          graph.identifiers_of(graph.targets[both_have_attribute])))
+    edges_with_attribute = list(zip(graph.identifiers_of(graph.sources[one_has_attribute]),
+                                    graph.identifiers_of(graph.targets[one_has_attribute])))
     edges_with_attribute = list(set(edges_with_attribute) - set(edges_with_both_attributes))
 
 
-    nx.draw_networkx_edges(graph, pos, edgelist=edges_with_attribute, width=3, alpha=0.2, edge_color='black',
+    nx.draw_networkx_edges(weighted_graph, pos, edgelist=edges_with_attribute, width=3, alpha=0.2, edge_color='black',
                            arrowsize=arrow_size, arrowstyle='->')
-    nx.draw_networkx_edges(graph, pos, edgelist=edges_with_both_attributes, width=5, alpha=0.5, edge_color='red',
+    nx.draw_networkx_edges(weighted_graph, pos, edgelist=edges_with_both_attributes, width=5, alpha=0.5, edge_color='red',
                            arrowsize=arrow_size, arrowstyle='->')
 
     plt.title('Social Map Highlighting ' + attribute[::-1], fontsize=20)
@@ -71,12 +73,11 @@ def draw_social_map(graph, identifier_to_name, identifier_to_features, attribute
 
     # show only the nodes with the attribute
     plt.figure(figsize=(10, 10))
-    nx.draw_networkx_nodes(graph, pos, nodelist=[node for node in graph.nodes() if attribute in identifier_to_features[node]],
-                           node_color='red', node_size=3000)
+    nx.draw_networkx_nodes(weighted_graph, pos, nodelist=attribute_nodes, node_color='red', node_size=3000)
     # add labels for the nodes with the attribute
-    nx.draw_networkx_labels(graph, pos, labels={k: v[::-1] for k, v in identifier_to_name.items() if k in [node for node in graph.nodes() if attribute in identifier_to_features[node]]},
+    nx.draw_networkx_labels(weighted_graph, pos, labels={k: v[::-1] for k, v in identifier_to_name.items() if k in set(attribute_nodes)},
                             font_size=10, font_weight='bold')
-    nx.draw_networkx_edges(graph, pos, edgelist=edges_with_both_attributes, width=5, alpha=0.5, edge_color='red',
+    nx.draw_networkx_edges(weighted_graph, pos, edgelist=edges_with_both_attributes, width=5, alpha=0.5, edge_color='red',
                            arrowsize=arrow_size, arrowstyle='->')
     plt.title('Social Map Highlighting ' + attribute[::-1], fontsize=20)
     plt.axis('off')  # Turn off the axis
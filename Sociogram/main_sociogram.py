@@ -1,7 +1,11 @@
+from typing import List, Dict, Tuple
+
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
 from Sociogram import sociogram, demographic_maps
+from Sociogram.sociogram_graph import SociogramGraph
 from private_slides import *
 from clique_slides import *
 from demographic_maps import *
@@ -30,17 +34,22 @@ PLOT_HISTOGRAMS = False  # whether to plot histograms or not
 Currently shown stats:
 1. 'In-Degree' (no list)
 2. 'Previous In-Degree' (no list)
-3. 'Centrality' (no list)
-4. 'Bidirectional Edges' (list)
-5. 'Unidirectional Edges from Node' (list)
-6. 'Unidirectional Edges to Node' (list)
-7. 'Connections Formed' (list)
-8. 'Connections Deformed' (list)
-9. 'Pion Friends' (list)
+3. 'Centrality' (no list) - closeness centrality
+4. 'Harmonic Centrality' (no list)
+5. 'Eccentricity' (no list) - the longest distance to a cadet reached by the cadet
+6. '2-Hop Reach' (no list) - number of cadets reached in at most 2 steps
+7. 'PageRank' (no list)
+8. 'Betweenness' (no list)
+9. 'Bidirectional Edges' (list)
+10. 'Unidirectional Edges from Node' (list)
+11. 'Unidirectional Edges to Node' (list)
+12. 'Connections Formed' (list)
+13. 'Connections Deformed' (list)
+14. 'Pion Friends' (list)
 """
 SHOW_LIST = [True, True, True, True, True,
              True]  # whether to show the list in the graph description or not for every stat
-NO_LIST_STATS = 3  # number of stats which do not contain lists
+NO_LIST_STATS = 8  # number of stats which do not contain lists
 LIST_STATS = 6  # number of stats which contain lists
 
 MIN_CLIQUE_SIZE = 3
@@ -51,9 +60,9 @@ ASSIGNING_ITERATIONS = 3  # number of iterations to perform assigning remaining
 FEATURE_THRESHOLD = 0.5  # part of the group that needs to have this feature in order to consider it a dominant feature
 NUM_DOMINANT_NODES = 3  # the number of dominant nodes to display in the title of the group graph
 
-def create_graph(dfs: List[pd.DataFrame], num_to_identifier: List[Dict[int, str]], index: int) -> nx.DiGraph:
+def create_sociogram(dfs: List[pd.DataFrame], num_to_identifier: List[Dict[int, str]], index: int) -> SociogramGraph:
     """
-    Create a directed graph based on the input data for a specific semester.
+    Create the compact directed graph of a specific semester, which is used by all of the slides.
 
     :param dfs: List of DataFrames.
     :param num_to_identifier: Dictionary mapping numbers to cadet identifier (usually id).
@@ -61,19 +70,59 @@ def create_graph(dfs: List[pd.DataFrame], num_to_identifier: List[Dict[int, str]
     :return: A directed graph representing social connections for the specified semester.
     """
     df = dfs[index]
-    g = nx.DiGraph()  # creating a directed graph
-    g.add_nodes_from(df[IDENTIFIER].tolist())  # adding the list of names as nodes to the graph
-    for idx, row in df.iterrows():  # iterating over cadets
-        u = row[IDENTIFIER]
+    sources, targets = create_edge_list(df, num_to_identifier[index])
+    return SociogramGraph(df[IDENTIFIER].tolist(), sources, targets)
+
+
+def create_edge_list(df: pd.DataFrame, num_to_identifier: Dict[int, str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Create the edges of a semester from the choices columns, cadet by cadet and in the order of the choices.
+
+    :param df: DataFrame of the semester.
+    :param num_to_identifier: Dictionary mapping numbers to cadet identifier of the semester.
+    :return: Arrays of the identifiers of the choosing cadets and of the chosen cadets.
+    """
+    # the choices table flattened row by row, the chooser of every choice is repeated for all of its choices
+    choices = df[CHOICES].to_numpy().ravel()
+    sources = np.repeat(df[IDENTIFIER].to_numpy(), len(CHOICES))
+
+    # remove the nan choices (if someone didnt put 6 friends)
+    chosen = pd.notna(choices)
+    choices, sources = choices[chosen], sources[chosen]
+
+    # join the chosen numbers with the numbers of the cadets
+    targets = pd.Series(choices).map(num_to_identifier)
+    unknown = targets.isna().to_numpy()
+    if unknown.any():
+        raise Exception(f'Choices which are not a number of a cadet: {sorted(set(choices[unknown].tolist()))}')
+    return sources, targets.to_numpy()
 
-        # if row[CHOICES_LIST] has nan values then remove them (if someone didnt put 6 friends)
-        row[CHOICES_LIST] = [x for x in row[CHOICES_LIST] if str(x) != 'nan']
 
-        vs = [num_to_identifier[index][x] for x in
-              row[CHOICES_LIST]]  # per cadet, this is the list of his/her chosen friends
-        for v in vs:
-            g.add_edge(u, v)  # iterating over the chosen friends and adding the edges
-    return g
+def create_lookups(dfs: List[pd.DataFrame]):
+    """
+    Create the lookup dictionaries of all semesters, in one pass over the columns of every semester.
+
+    :param dfs: List of DataFrames.
+    :return: num_to_identifier, num_to_choices and identifier_to_num (per semester), identifier_to_name (of the first
+             semester) and identifier_to_features (per semester).
+    """
+    num_to_identifier, num_to_choices, identifier_to_num = [], [], []
+    for df in dfs:
+        nums = df[NUM].tolist()
+        identifiers = df[IDENTIFIER].tolist()
+        num_to_identifier.append(dict(zip(nums, identifiers)))  # dictionary from <cadet num> to <cadet identifier>
+        num_to_choices.append(dict(zip(nums, df[CHOICES].to_numpy())))  # the row of choices of every cadet num
+        identifier_to_num.append(dict(zip(identifiers, nums)))
+    identifier_to_name = dict(zip(dfs[0][IDENTIFIER].tolist(), dfs[0][NAME].tolist()))
+
+    if all(set(FEATURES_FOR_PRIVATE_SLIDES).issubset(df.columns) for df in dfs):
+        identifier_to_features = [dict(zip(df[IDENTIFIER].tolist(), df[FEATURES_FOR_PRIVATE_SLIDES].values.tolist()))
+                                  for df in dfs]
+    else:
+        print("Required features not found in table!")
+        identifier_to_features = [{identifier: [] for identifier in df[IDENTIFIER].tolist()} for df in dfs]
+
+    return num_to_identifier, num_to_choices, identifier_to_num, identifier_to_name, identifier_to_features
 
 
 if __name__ == '__main__':
@@ -84,24 +133,11 @@ if __name__ == '__main__':
 
     for i in range(len(dfs)):
         dfs[i][NAME] = dfs[i][NAME].str.strip()
-        dfs[i][CHOICES_LIST] = dfs[i].loc[:, CHOICES].apply(lambda r: r.tolist(),
-                                                            axis=1)  # transforming the list of columns into a column containing lists of the choices per cader
-
-    num_to_identifier = [{row[NUM]: row[IDENTIFIER] for _, row in dfs[i].iterrows()} for i in
-                         range(len(dfs))]  # dictionary from <cadet num> to <cadet name>
-    num_to_choices = [{row[NUM]: row[CHOICES] for _, row in dfs[i].iterrows()} for i in range(len(dfs))]
-    identifier_to_num = [{row[IDENTIFIER]: row[NUM] for _, row in dfs[i].iterrows()} for i in range(len(dfs))]
-    identifier_to_name = {row[IDENTIFIER]: row[NAME] for _, row in dfs[0].iterrows()}
-
-    try:
-        identifier_to_features = [
-            {row[IDENTIFIER]: [row[c] for c in FEATURES_FOR_PRIVATE_SLIDES] for _, row in dfs[i].iterrows()} for i in
-            range(len(dfs))]
-    except Exception as e:
-        print("Required features not found in table!")
-        identifier_to_features = [{row[IDENTIFIER]: [] for _, row in dfs[i].iterrows()} for i in range(len(dfs))]
 
-    graphs = [create_graph(dfs, num_to_identifier, i) for i in range(len(dfs))]
+    num_to_identifier, num_to_choices, identifier_to_num, identifier_to_name, identifier_to_features = \
+        create_lookups(dfs)
+
+    graphs = [create_sociogram(dfs, num_to_identifier, i) for i in range(len(dfs))]
 
     # draw full graph for relevant semester
     # draw_full_graph(graphs[SEMESTER_INDEX], identifier_to_name, identifier_to_features[SEMESTER_INDEX])
@@ -112,7 +148,7 @@ if __name__ == '__main__':
     # plot private cadet slides
     print("plotting slides for each cadet...")
     privateSlides = PrivateSlides(dfs, graphs, num_to_identifier, identifier_to_num, identifier_to_name, num_to_choices)
-    for identifier in tqdm(graphs[SEMESTER_INDEX].nodes()):
+    for identifier in tqdm(graphs[SEMESTER_INDEX].identifiers):
         privateSlides.plot_sociogram(identifier)
 
     # plot group slides
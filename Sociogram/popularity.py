@@ -11,10 +11,12 @@ OUTPUT_TXT = 'output_text.txt'
 
 
 def count_connections(data, print_connections=False):
-    num_connections = np.zeros(len(data), dtype=int)
-    for column in data.iloc[:, 2:]:
-        for value in data[column]:
-            num_connections[value - 1] += 1
+    # the number of times every cadet was chosen, at the index of their number (a repeated choice counts every time,
+    # the empty choices and the numbers which are not of a cadet are skipped)
+    choices = data.iloc[:, 2:].to_numpy().ravel()
+    choices = choices[pd.notna(choices)].astype(int)
+    choices = choices[(choices >= 1) & (choices <= len(data))]
+    num_connections = np.bincount(choices - 1, minlength=len(data))
 
     if print_connections:
         for index, value in data['שם מלא'].items():
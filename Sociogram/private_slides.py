@@ -1,23 +1,49 @@
 import os
+import numpy as np
 import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 from Sociogram import main_sociogram
+from Sociogram.sociogram_graph import SociogramGraph
+from Sociogram.sociogram_metrics import calculate_metrics
+
+
+class EgoNetwork:
+
+    def __init__(self, center: str, nodes: List[str], ex_friends: List[str], connections_formed: List[str],
+                 bidirectional_edges: List[Tuple[str, str]], unidirectional_edges: List[Tuple[str, str]]):
+        """
+        The part of the graph which is drawn in the sociogram of a cadet.
+
+        :param center: Identifier of the cadet.
+        :param nodes: The neighbours of the cadet, the cadet and their ex-friends.
+        :param ex_friends: Friends from the previous semester who are not connected to the cadet anymore.
+        :param connections_formed: Good friends of the cadet who were not connected to them in the previous semester.
+        :param bidirectional_edges: The edges between the nodes which have an edge in the opposite direction.
+        :param unidirectional_edges: The other edges between the nodes.
+        :return: None
+        """
+        self.center = center
+        self.nodes = nodes
+        self.ex_friends = ex_friends
+        self.connections_formed = connections_formed
+        self.bidirectional_edges = bidirectional_edges
+        self.unidirectional_edges = unidirectional_edges
 
 
 class PrivateSlides:
 
-    def __init__(self, dfs: List[pd.DataFrame], graphs: List[nx.DiGraph], num_to_identifier: List[Dict[int, str]],
+    def __init__(self, dfs: List[pd.DataFrame], graphs: List[SociogramGraph], num_to_identifier: List[Dict[int, str]],
                  identifier_to_num: List[Dict[str, int]], identifier_to_name: Dict[str, str],
                  num_to_choices: List[Dict[int, pd.DataFrame]]):
         """
         Initialize PrivateSlides instance.
 
         :param dfs: List of DataFrames.
-        :param graphs: List of directed graphs.
+        :param graphs: List of the directed graphs of the semesters.
         :param num_to_identifier: Dictionary mapping numbers to cadet names.
         :param identifier_to_num: Dictionary mapping cadet names to numbers.
         :param num_to_choices: Dictionary mapping numbers to DataFrame of choices.
@@ -38,8 +64,15 @@ class PrivateSlides:
         self.show_list = main_sociogram.SHOW_LIST
 
         self.pions = list(set(dfs[0].loc[:, self.identifier_col]) - set(dfs[-1].loc[:, self.identifier_col]))
-        self.bigraphs = [PrivateSlides.filter_bidirectional(g) for g in graphs]
+        self.pion_set = set(self.pions)
+
+        # the cadets of all of the semesters, the indices of the good friends matrix
+        self.all_identifiers = list(dict.fromkeys(identifier for g in graphs for identifier in g.identifiers))
+        self.identifier_to_index = {identifier: i for i, identifier in enumerate(self.all_identifiers)}
+        self.good_friends = self.calculate_good_friends()
         self.stats_df = self.calculate_node_features()
+        self.stats_by_identifier = self.stats_df.set_index(self.identifier_col, drop=False)
+        self.ego_index = self.build_ego_index()
 
     def print_description(self, data: pd.Series) -> str:
         description = ""
@@ -63,35 +96,37 @@ class PrivateSlides:
         """
         # Initialize lists to store feature values for each node
         g = self.graphs[self.semester_idx]
-        nodes = list(g.nodes())
-        in_degrees = [g.in_degree(node) for node in nodes]
-        centrality = [nx.closeness_centrality(g, node) for node in nodes]
+        nodes = g.identifiers
+        in_degrees = g.in_degree.tolist()
+        # closeness centrality and the other centrality metrics, of all of the nodes together
+        metrics = calculate_metrics(g)
 
         # these are the absolute stats per-cadet in the graph
-        bidirectional_edges = [[v for u, v in g.out_edges(node) if g.has_edge(v, node)] for node in nodes]
-        unidirectional_from_nodes = [[v for u, v in g.out_edges(node) if not g.has_edge(v, node)] for node in nodes]
-        unidirectional_to_nodes = [[u for u, _ in g.in_edges(node) if not g.has_edge(node, u)] for node in nodes]
+        bidirectional_edges = [g.identifiers_of(g.out_neighbors(i, reciprocal=True)) for i in range(g.n)]
+        unidirectional_from_nodes = [g.identifiers_of(g.out_neighbors(i, reciprocal=False)) for i in range(g.n)]
+        unidirectional_to_nodes = [g.identifiers_of(g.in_neighbors(i, reciprocal=False)) for i in range(g.n)]
 
         if self.semester_idx > 0:
             # kind of voodo magic if there is problem here talk with Iftah Farkash if hes still in Talpiot
-            prev_in_degrees = [self.graphs[self.semester_idx-1].in_degree(node) for node in nodes]
+            prev_g = self.graphs[self.semester_idx - 1]
+            prev_in_degrees = [int(prev_g.in_degree[prev_g.identifier_to_id[node]]) for node in nodes]
             connections_formed = [
-                [u for u, v in self.bigraphs[self.semester_idx].in_edges(node)
-                 if not self.graphs[self.semester_idx-1].has_edge(u, v)
-                 and not self.graphs[self.semester_idx-1].has_edge(v, u)] for node in nodes]
-            connections_deformed = [[u for u, v in self.bigraphs[self.semester_idx - 1].in_edges(node)
-                                     if u not in self.pions and not g.has_edge(u, v)
-                                     and not g.has_edge(v, u)] for node in nodes]
+                [u for u in g.identifiers_of(g.in_neighbors(i, reciprocal=True))
+                 if not prev_g.has_edge(u, node) and not prev_g.has_edge(node, u)] for i, node in enumerate(nodes)]
+            connections_deformed = [self.ex_friends(node) for node in nodes]
         else:
             prev_in_degrees, connections_formed, connections_deformed = [0] * len(nodes), [[]] * len(nodes), [[]] * len(nodes)
 
-        pion_friends = [[p for p in self.pions if self.are_good_friends(node, p)] for node in nodes]
+        pion_indices = np.array([self.identifier_to_index[p] for p in self.pions], dtype=np.int64)
+        node_indices = np.array([self.identifier_to_index[node] for node in nodes], dtype=np.int64)
+        is_pion_friend = self.good_friends[np.ix_(node_indices, pion_indices)]
+        pion_friends = [[self.pions[j] for j in np.flatnonzero(row)] for row in is_pion_friend]
         # Create a DataFrame
         data = {
             self.identifier_col: nodes,
             'In-Degree': in_degrees,
             'Previous In-Degree': prev_in_degrees,
-            'Centrality': centrality,
+            **metrics,
             'Bidirectional Edges': bidirectional_edges,
             'Unidirectional Edges from Node': unidirectional_from_nodes,
             'Unidirectional Edges to Node': unidirectional_to_nodes,
@@ -130,20 +165,13 @@ class PrivateSlides:
         fig = plt.figure(figsize=(12, 8))
         ax = [fig.add_subplot(gs[0]), fig.add_subplot(gs[1])]
 
-        # obtaining the list of nodes which are adjacent to the given cadet
-        nodes = [u for u in g.nodes() if (g.has_edge(u, identifier) | g.has_edge(identifier, u))]
-        nodes.append(identifier)
-        if self.semester_idx > 0:
-            ex_friends = [u for u, v in self.bigraphs[self.semester_idx-1].in_edges(identifier) if u not in self.pions and not g.has_edge(u, v) and not g.has_edge(v, u)]
-        else:
-            ex_friends = []
-        nodes.extend(ex_friends)
-
-        # drawing the subgraph containing only the above nodes
-        self.help_draw(g.subgraph(nodes), center=identifier, ex_friends=ex_friends, ax=ax[0])
+        # drawing the subgraph containing only the cadet, the nodes which are adjacent to them and their ex-friends
+        ego = self.ego_index[identifier]
+        self.help_draw(g.to_networkx().subgraph(ego.nodes), center=identifier, ex_friends=ego.ex_friends, ax=ax[0])
 
         # adding text, title, and saving the figure
-        ax[1].text(0, .4, self.print_description(self.stats_df[self.stats_df[self.identifier_col] == identifier].squeeze()))
+        # centered vertically, so the longer descriptions (with all of the metrics) fit in the figure
+        ax[1].text(0, .5, self.print_description(self.stats_by_identifier.loc[identifier]), va='center')
         ax[1].axis('off')
         fig.suptitle(f'{name[::-1]}')
         # fig.suptitle(f'{name} - סמסטר {self.semester_idx + 1}'[::-1])
@@ -154,6 +182,50 @@ class PrivateSlides:
         file_path = os.path.join(output, f'{name}.png')
         plt.savefig(file_path)
 
+    def build_ego_index(self) -> Dict[str, EgoNetwork]:
+        """
+        Build the ego network of every cadet, from the adjacency of the cadet and of their neighbours only.
+
+        :return: Dictionary mapping cadet identifiers to their EgoNetwork.
+        """
+        g = self.graphs[self.semester_idx]
+        ego_index = {}
+        for identifier, ex_friends, connections_formed in zip(self.stats_df[self.identifier_col],
+                                                              self.stats_df['Connections Deformed'],
+                                                              self.stats_df['Connections Formed']):
+            center = g.identifier_to_id[identifier]
+            neighbors = g.neighbors(center)
+            nodes = g.identifiers_of(neighbors) + [identifier] + ex_friends
+
+            # the edges between the nodes, from the out adjacency of every node
+            ids = np.unique(g.ids_of(nodes))
+            ids = ids[ids >= 0]
+            bidirectional_edges, unidirectional_edges = [], []
+            for u in ids:
+                start, end = g.out_indptr[u], g.out_indptr[u + 1]
+                in_ego = np.isin(g.out_indices[start:end], ids)
+                targets = g.identifiers_of(g.out_indices[start:end][in_ego])
+                for v, reciprocal in zip(targets, g.out_reciprocal[start:end][in_ego]):
+                    (bidirectional_edges if reciprocal else unidirectional_edges).append((g.identifiers[u], v))
+
+            ego_index[identifier] = EgoNetwork(identifier, nodes, ex_friends, connections_formed, bidirectional_edges,
+                                               unidirectional_edges)
+        return ego_index
+
+    def ex_friends(self, identifier: str) -> List[str]:
+        """
+        The friends of a cadet from the previous semester (both chose each other) who are not connected to the cadet
+        anymore, and did not leave.
+
+        :param identifier: Identifier of the cadet.
+        :return: The identifiers of the ex-friends.
+        """
+        g = self.graphs[self.semester_idx]
+        prev_g = self.graphs[self.semester_idx - 1]
+        prev_friends = prev_g.identifiers_of(prev_g.in_neighbors(prev_g.identifier_to_id[identifier], reciprocal=True))
+        return [u for u in prev_friends
+                if u not in self.pion_set and not g.has_edge(u, identifier) and not g.has_edge(identifier, u)]
+
     def are_good_friends(self, name1: str, name2: str) -> bool:
         """
         Helper function to determine if two cadets are good friends.
@@ -162,14 +234,32 @@ class PrivateSlides:
         :param name2: Name of the second cadet.
         :return: True if the cadets are good friends, False otherwise.
         """
-        for i in range(len(self.dfs)):
-            if name1 not in self.identifier_to_num[i] or name2 not in self.identifier_to_num[i]:
-                return False
-            num1 = self.identifier_to_num[i][name1]
-            num2 = self.identifier_to_num[i][name2]
-            if num2 in self.num_to_choices[i][num1].tolist() and num1 in self.num_to_choices[i][num2].tolist():
-                return True
-        return False
+        i, j = self.identifier_to_index.get(name1), self.identifier_to_index.get(name2)
+        if i is None or j is None:
+            return False
+        return bool(self.good_friends[i, j])
+
+    def calculate_good_friends(self) -> np.ndarray:
+        """
+        Calculate which cadets were good friends (chose each other) in a semester, where both of them were in it and in
+        all of the semesters before it.
+
+        :return: Boolean matrix over the indices of self.all_identifiers.
+        """
+        n = len(self.all_identifiers)
+        good_friends = np.zeros((n, n), dtype=bool)
+        present = np.ones(n, dtype=bool)  # the cadets who were in all of the semesters so far
+        for g in self.graphs:
+            indices = np.array([self.identifier_to_index[identifier] for identifier in g.identifiers], dtype=np.int64)
+            in_semester = np.zeros(n, dtype=bool)
+            in_semester[indices] = True
+            present &= in_semester
+
+            sources = indices[g.sources[g.out_reciprocal]]
+            targets = indices[g.targets[g.out_reciprocal]]
+            both_present = present[sources] & present[targets]
+            good_friends[sources[both_present], targets[both_present]] = True
+        return good_friends
 
     def help_draw(self, g: nx.DiGraph, center: str, ex_friends: List[str], ax: plt.Axes = None) -> None:
         """
@@ -195,7 +285,7 @@ class PrivateSlides:
         # Adjust x-coordinate to place labels to the left of each node
         label_pos = {k: (v[0] - 0.07, v[1]) for k, v in pos.items()}
 
-        connections_formed = list(self.stats_df[self.stats_df[self.identifier_col] == center]['Connections Formed'])[0]
+        ego = self.ego_index[center]
 
         if ax == None:
             fig, ax = plt.subplots(figsize=(12, 8))
@@ -204,16 +294,15 @@ class PrivateSlides:
         nx.draw_networkx_labels(g, label_pos, labels=flipped_node_names, font_size=12, font_color='black', ax=ax)
 
         # Draw nodes and edges with custom arrow and edge settings
-        edges = g.edges()
-        bidirectional_edges = [(u, v) for u, v in edges if (v, u) in edges]
         broken_edges = [(u, center) for u in ex_friends]
-        formed_edges = [(u, center) for u in connections_formed] + [(center, u) for u in connections_formed]
+        formed_edges = [(u, center) for u in ego.connections_formed] + [(center, u) for u in ego.connections_formed]
 
-        unidirectional_edges = list(set(edges) - set(bidirectional_edges))
-        bidirectional_edges = list(set(bidirectional_edges) - set(formed_edges))
+        unidirectional_edges = ego.unidirectional_edges
+        bidirectional_edges = list(set(ego.bidirectional_edges) - set(formed_edges))
 
         # drawing the graph
-        node_color = ['k' if node == center else ('red' if node in ex_friends else 'grey') for node in g.nodes()]
+        ex_friends_set = set(ex_friends)
+        node_color = ['k' if node == center else ('red' if node in ex_friends_set else 'grey') for node in g.nodes()]
         nx.draw(g, pos=pos, with_labels=False, edgelist=unidirectional_edges, edge_color='green', arrowsize=20,
                 alpha=0.5,
                 ax=ax)
@@ -222,22 +311,6 @@ class PrivateSlides:
         nx.draw_networkx_edges(g, pos=pos, edgelist=broken_edges, edge_color='red', alpha=0.8, arrows=False, ax=ax)
         nx.draw_networkx_edges(g, pos=pos, edgelist=formed_edges, edge_color='blue', alpha=0.8, arrows=False, ax=ax)
 
-    @staticmethod
-    def filter_bidirectional(g: nx.DiGraph) -> nx.DiGraph:
-        """
-        Filter bidirectional edges from a directed graph.
-
-        :param g: Directed graph.
-        :return: A new directed graph containing only bidirectional edges.
-        """
-        bidirectional_graph = nx.DiGraph()
-        bidirectional_graph.add_nodes_from(g.nodes())
-
-        bidirectional_edges = [(u, v) for u, v in g.edges() if g.has_edge(v, u)]
-        bidirectional_graph.add_edges_from(bidirectional_edges)
-
-        return bidirectional_graph
-
     @staticmethod
     def plot_node_features_table(df: pd.DataFrame, node_name: str, ax: plt.Axes = None) -> None:
         """
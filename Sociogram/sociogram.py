@@ -8,28 +8,6 @@ import networkx as nx
 from Sociogram import main_sociogram
 
 
-def get_count_dict(df_to_count, nodes_to_count=None):
-    """
-    get dict {node: num of connections to}
-    :param df_to_count: df to count all connections of a subgroup
-    :param edges_columns: the columns of connections
-    :param nodes_to_count: count connections only for specific subgroup
-    :return:
-    """
-    edges_columns = main_sociogram.CHOICES
-    count_dict = dict()
-    for edge in edges_columns:
-        for node in list(df_to_count[edge].values):
-            # the case want to count only connections with specific subgraph
-            if (nodes_to_count is not None) and (node not in nodes_to_count):
-                continue
-            if node in count_dict:
-                count_dict[node] += 1
-            else:
-                count_dict[node] = 1
-    return count_dict
-
-
 def get_group_connection_value(df, category, group_name):
     """
     get the connectivity value
@@ -39,18 +17,17 @@ def get_group_connection_value(df, category, group_name):
     :return:
     """
     size = len(df)
-    subgroup_df = df[df[category] == group_name]
-    subgroup_size = len(subgroup_df)
+    in_subgroup = (df[category] == group_name).to_numpy()
+    subgroup_size = in_subgroup.sum()
+    # the choices of a cadet of the subgroup (a repeated choice counts every time)
+    chose_subgroup = df[main_sociogram.CHOICES].isin(df.loc[in_subgroup, main_sociogram.NUM].unique()).to_numpy()
 
     # get expected inner connections - num_of_connections_to_group * (size_group/total_size)
-    all_connections_to_subgroup = get_count_dict(df_to_count=df, nodes_to_count=list(subgroup_df[main_sociogram.NUM].unique()))
-    num_all_connections = sum([all_connections_to_subgroup[k] for k in all_connections_to_subgroup.keys()])
+    num_all_connections = chose_subgroup.sum()
     expected_inner_connections = num_all_connections * (subgroup_size/size)
 
     # get inner connections
-    inner_connections_to_subgroup = get_count_dict(df_to_count=subgroup_df, nodes_to_count=list(subgroup_df[main_sociogram.NUM].unique()))
-    num_inner_connections = sum([inner_connections_to_subgroup[k] for k in inner_connections_to_subgroup.keys()])
-    inner_connections = num_inner_connections
+    inner_connections = chose_subgroup[in_subgroup].sum()
 
     return inner_connections/expected_inner_connections
 
@@ -88,9 +65,3 @@ def plot_histogram(file_path):
     plot_connectivity_hists_by_category = True
     if plot_connectivity_hists_by_category:
         plot_hists_by_category(df)
-
-    # print_number_connections = True
-    # if print_number_connections:
-    #     count_dict = get_count_dict(df)
-    #     for key in count_dict:
-    #         print(f"{df[df['שם מלא - מספר'] == key]['שם מלא'].iloc[0]}: {count_dict[key]}")
\ No newline at end of file
@@ -0,0 +1,179 @@
+from typing import List, Iterable, Set
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+
+class SociogramGraph:
+
+    def __init__(self, identifiers: Iterable, sources: Iterable, targets: Iterable):
+        """
+        Compact directed graph of the choices of a semester. The cadets are numbered 0..n-1 (their id) in the given
+        order, and the edges are kept in CSR form both by source and by target: the out-neighbours of the id i are
+        out_indices[out_indptr[i]:out_indptr[i + 1]], in the order the edges were added (like in nx.DiGraph).
+
+        :param identifiers: Identifiers of the cadets, the nodes of the graph.
+        :param sources: Identifier of the choosing cadet of every edge.
+        :param targets: Identifier of the chosen cadet of every edge.
+        :return: None
+        """
+        self.identifiers = list(dict.fromkeys(identifiers))
+        self.identifier_to_id = {identifier: i for i, identifier in enumerate(self.identifiers)}
+        self.n = len(self.identifiers)
+        self.index = pd.Index(self.identifiers)
+        # id -> identifier for arrays of ids
+        self.identifiers_array = np.empty(self.n, dtype=object)
+        self.identifiers_array[:] = self.identifiers
+
+        sources, targets = self.ids_of(sources), self.ids_of(targets)
+        if (sources < 0).any() or (targets < 0).any():
+            raise Exception('Edges between identifiers which are not nodes of the graph!')
+
+        # choosing the same cadet twice is one edge
+        codes = sources * self.n + targets
+        _, first = np.unique(codes, return_index=True)
+        first = np.sort(first)
+        sources, targets, codes = sources[first], targets[first], codes[first]
+        self.edge_codes = set(codes.tolist())
+
+        # stable sorts keep the edges of every node in the order they were added
+        out_order = np.argsort(sources, kind='stable')
+        in_order = np.argsort(targets, kind='stable')
+        self.out_indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=self.n))])
+        self.in_indptr = np.concatenate([[0], np.cumsum(np.bincount(targets, minlength=self.n))])
+        self.out_indices = targets[out_order]
+        self.in_indices = sources[in_order]
+        self.out_degree = np.diff(self.out_indptr)
+        self.in_degree = np.diff(self.in_indptr)
+
+        # the edges in the order of the out adjacency (the order of nx.DiGraph.edges())
+        self.sources = sources[out_order]
+        self.targets = self.out_indices
+
+        # whether the edge has an edge in the opposite direction, for the out and the in adjacency
+        self.out_reciprocal = np.isin(self.targets * self.n + self.sources, codes)
+        self.in_reciprocal = np.isin(targets[in_order] * self.n + self.in_indices, codes)
+
+        self.networkx_graph = None
+
+    @classmethod
+    def from_choices(cls, nums: Iterable, choices: np.ndarray) -> 'SociogramGraph':
+        """
+        Create the graph of a table of choices, where the cadets are identified by their numbers.
+
+        :param nums: The number of every cadet.
+        :param choices: Matrix of the numbers chosen by every cadet (a row per cadet), nan where there is no choice.
+        :return: The graph, its identifiers are the numbers of the cadets.
+        """
+        nums = list(nums)
+        choices = np.asarray(choices)
+        sources = np.repeat(np.array(nums, dtype=object), choices.shape[1])
+        choices = choices.ravel()
+        chosen = pd.notna(choices)
+        return cls(nums, sources[chosen], choices[chosen])
+
+    def ids_of(self, identifiers: Iterable) -> np.ndarray:
+        """
+        :param identifiers: Identifiers of cadets.
+        :return: The ids of the identifiers, -1 for identifiers which are not in the graph.
+        """
+        identifiers = list(identifiers)
+        if len(identifiers) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.index.get_indexer(identifiers).astype(np.int64)
+
+    def identifiers_of(self, ids: np.ndarray) -> list:
+        return self.identifiers_array[ids].tolist()
+
+    def out_neighbors(self, i: int, reciprocal: bool = None) -> np.ndarray:
+        """
+        :param i: Id of the cadet.
+        :param reciprocal: True for only the cadets who chose them back, False for only the others, None for all.
+        :return: The ids of the cadets chosen by the cadet.
+        """
+        start, end = self.out_indptr[i], self.out_indptr[i + 1]
+        neighbors = self.out_indices[start:end]
+        if reciprocal is None:
+            return neighbors
+        return neighbors[self.out_reciprocal[start:end] == reciprocal]
+
+    def in_neighbors(self, i: int, reciprocal: bool = None) -> np.ndarray:
+        """
+        :param i: Id of the cadet.
+        :param reciprocal: True for only the cadets the cadet chose back, False for only the others, None for all.
+        :return: The ids of the cadets who chose the cadet.
+        """
+        start, end = self.in_indptr[i], self.in_indptr[i + 1]
+        neighbors = self.in_indices[start:end]
+        if reciprocal is None:
+            return neighbors
+        return neighbors[self.in_reciprocal[start:end] == reciprocal]
+
+    def neighbors(self, i: int) -> np.ndarray:
+        """
+        :param i: Id of the cadet.
+        :return: The sorted ids of the cadets connected to the cadet in any direction.
+        """
+        return np.union1d(self.out_neighbors(i), self.in_neighbors(i))
+
+    def has_edge(self, u, v) -> bool:
+        """
+        :param u: Identifier of the choosing cadet.
+        :param v: Identifier of the chosen cadet.
+        :return: True if u chose v, False also when one of them is not in the graph.
+        """
+        u, v = self.identifier_to_id.get(u), self.identifier_to_id.get(v)
+        if u is None or v is None:
+            return False
+        return u * self.n + v in self.edge_codes
+
+    def maximal_cliques(self) -> List[list]:
+        """
+        Find the maximal cliques of the undirected graph (an edge in any direction connects two cadets), with the
+        Bron-Kerbosch algorithm with pivoting, like nx.find_cliques.
+
+        :return: The identifiers of every maximal clique.
+        """
+        adjacency = [set() for _ in range(self.n)]
+        for u, v in zip(self.sources.tolist(), self.targets.tolist()):
+            if u != v:
+                adjacency[u].add(v)
+                adjacency[v].add(u)
+
+        cliques = []
+
+        def expand(clique: List[int], candidates: Set[int], excluded: Set[int]) -> None:
+            if not candidates and not excluded:
+                cliques.append(clique)
+                return
+            # the neighbours of the pivot are reached from the other candidates
+            pivot = max(candidates | excluded, key=lambda u: len(candidates & adjacency[u]))
+            for v in list(candidates - adjacency[pivot]):
+                expand(clique + [v], candidates & adjacency[v], excluded & adjacency[v])
+                candidates.remove(v)
+                excluded.add(v)
+
+        if self.n > 0:
+            expand([], set(range(self.n)), set())
+        return [self.identifiers_of(np.array(clique, dtype=np.int64)) for clique in cliques]
+
+    def to_networkx(self, weights: np.ndarray = None) -> nx.DiGraph:
+        """
+        Create the networkx graph, for drawing. The graph without weights is created once, it should not be modified.
+
+        :param weights: The 'weight' of every edge, in the order of self.sources and self.targets.
+        :return: Directed graph with the same nodes and edges (in the same order).
+        """
+        if weights is None and self.networkx_graph is not None:
+            return self.networkx_graph
+
+        g = nx.DiGraph()
+        g.add_nodes_from(self.identifiers)
+        edges = zip(self.identifiers_of(self.sources), self.identifiers_of(self.targets))
+        if weights is None:
+            g.add_edges_from(edges)
+            self.networkx_graph = g
+        else:
+            g.add_weighted_edges_from((u, v, w) for (u, v), w in zip(edges, np.asarray(weights).tolist()))
+        return g
@@ -0,0 +1,144 @@
+from typing import Dict
+
+import numpy as np
+
+from Sociogram.sociogram_graph import SociogramGraph
+
+SOURCES_BLOCK = 256  # number of BFS sources handled together, bounds the memory to SOURCES_BLOCK * edges
+PAGERANK_ALPHA = 0.85
+PAGERANK_TOL = 1.0e-6
+PAGERANK_MAX_ITER = 100
+
+
+def sum_over_edges(values: np.ndarray, indices: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """
+    Sum the columns of values over the edges of a CSR adjacency.
+
+    :param values: Matrix with a column per node.
+    :param indices: The CSR indices (the neighbour of every edge).
+    :param indptr: The CSR index pointers.
+    :return: Matrix with the same shape, the column of node i is the sum of the columns of its neighbours.
+    """
+    result = np.zeros(values.shape)
+    has_edges = indptr[1:] > indptr[:-1]
+    if has_edges.any():
+        result[:, has_edges] = np.add.reduceat(values[:, indices], indptr[:-1][has_edges], axis=1)
+    return result
+
+
+def shortest_paths(graph: SociogramGraph, sources: np.ndarray):
+    """
+    Breadth first search from all of the sources together, a level at a time over the CSR adjacency.
+
+    :param graph: The directed graph.
+    :param sources: Ids of the sources.
+    :return: The distance from every source to every node (-1 when it is not reachable), and the number of
+             shortest paths from every source to every node.
+    """
+    rows = np.arange(len(sources))
+    dist = np.full((len(sources), graph.n), -1, dtype=np.int32)
+    dist[rows, sources] = 0
+    sigma = np.zeros((len(sources), graph.n))
+    sigma[rows, sources] = 1
+    frontier = sigma.copy()
+
+    level = 0
+    while frontier.any():
+        level += 1
+        # number of shortest paths through the frontier, the nodes reached for the first time are the next level
+        reached = sum_over_edges(frontier, graph.in_indices, graph.in_indptr)
+        new = (reached > 0) & (dist < 0)
+        dist[new] = level
+        sigma[new] = reached[new]
+        frontier = np.where(new, reached, 0)
+    return dist, sigma
+
+
+def betweenness_dependencies(graph: SociogramGraph, dist: np.ndarray, sigma: np.ndarray) -> np.ndarray:
+    """
+    The dependency of every source on every node (Brandes), accumulated from the furthest level back to the source.
+
+    :param graph: The directed graph.
+    :param dist: Distances from the sources, the result of shortest_paths.
+    :param sigma: Numbers of shortest paths from the sources, the result of shortest_paths.
+    :return: Matrix of the dependencies, 0 for the sources themselves.
+    """
+    delta = np.zeros(dist.shape)
+    for level in range(int(dist.max(initial=0)), 1, -1):
+        at_level = dist == level
+        coefficients = np.where(at_level, (1 + delta) / np.where(at_level, sigma, 1), 0)
+        # every node before the level gets the coefficients of the nodes it chose in the level
+        before_level = dist == level - 1
+        delta[before_level] += (sigma * sum_over_edges(coefficients, graph.out_indices, graph.out_indptr))[before_level]
+    return delta
+
+
+def pagerank(graph: SociogramGraph, alpha: float = PAGERANK_ALPHA, tol: float = PAGERANK_TOL,
+             max_iter: int = PAGERANK_MAX_ITER) -> np.ndarray:
+    """
+    PageRank by power iteration over the edges (the same as nx.pagerank with the default parameters).
+
+    :param graph: The directed graph.
+    :return: The PageRank of every node.
+    """
+    n = graph.n
+    if n == 0:
+        return np.zeros(0)
+    x = np.full(n, 1.0 / n)
+    out_degree = graph.out_degree.astype(float)
+    dangling = out_degree == 0
+    edge_weights = 1.0 / out_degree[graph.sources]
+    for _ in range(max_iter):
+        last = x
+        # the rank of the cadets who chose nobody is spread evenly
+        x = alpha * (np.bincount(graph.targets, weights=last[graph.sources] * edge_weights, minlength=n) +
+                     last[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(x - last).sum() < n * tol:
+            break
+    return x
+
+
+def calculate_metrics(graph: SociogramGraph) -> Dict[str, np.ndarray]:
+    """
+    Calculate the centrality metrics of all nodes from one breadth first search of all pairs of nodes.
+    Like networkx, the closeness and the harmonic centrality are of the distances to the node (from the cadets who
+    reach it), the eccentricity is the longest distance from the node to a cadet it reaches, and the betweenness is
+    normalized by (n - 1)(n - 2).
+
+    :param graph: The directed graph.
+    :return: Dictionary from the name of every metric to its value for every node, in the order of the ids.
+    """
+    n = graph.n
+    distance_sums = np.zeros(n)
+    reaching = np.zeros(n)
+    harmonic = np.zeros(n)
+    eccentricity = np.zeros(n, dtype=int)
+    two_hop_reach = np.zeros(n, dtype=int)
+    betweenness = np.zeros(n)
+
+    for start in range(0, n, SOURCES_BLOCK):
+        sources = np.arange(start, min(start + SOURCES_BLOCK, n))
+        dist, sigma = shortest_paths(graph, sources)
+        reachable = dist >= 0
+
+        distance_sums += np.where(reachable, dist, 0).sum(axis=0)
+        reaching += reachable.sum(axis=0)
+        harmonic += np.where(dist > 0, 1 / np.where(dist > 0, dist, 1), 0).sum(axis=0)
+        eccentricity[sources] = dist.max(axis=1)
+        two_hop_reach[sources] = ((dist == 1) | (dist == 2)).sum(axis=1)
+        betweenness += betweenness_dependencies(graph, dist, sigma).sum(axis=0)
+
+    # the improved formula of Wasserman and Faust, scaled by the part of the cadets who reach the node
+    closeness = np.zeros(n)
+    if n > 1:
+        reached = distance_sums > 0
+        closeness[reached] = ((reaching[reached] - 1) / distance_sums[reached]) * ((reaching[reached] - 1) / (n - 1))
+    if n > 2:
+        betweenness /= (n - 1) * (n - 2)
+
+    return {'Centrality': closeness,
+            'Harmonic Centrality': harmonic,
+            'Eccentricity': eccentricity,
+            '2-Hop Reach': two_hop_reach,
+            'PageRank': pagerank(graph),
+            'Betweenness': betweenness}
@@ -1,9 +1,13 @@
 import os
+import sys
+
 from docx import Document
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from docx.oxml.shared import qn
 from docx.shared import Inches, Pt
 
+# the modules shared with the other packages are in shared/ in the root of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.image_embedding import add_picture, fix_picture_ids
+
 FORMAT_PATH = "../Formats/demographic_report_format.docx"
 OUTPUT_PATH = "output/"
 
@@ -29,34 +33,15 @@ class DocxHelper:
         :return:
         """
         for i in range(int(len(hists))):
-            # save the hist as png, so we can load to word as a picture
-            cur_hist = hists[i]
-            TMP_FILE_PATH = "tmp.png"
-            with open(TMP_FILE_PATH, 'wb') as f:
-                f.write(cur_hist)
-
-            # load png
+            # the histograms are png bytes, added to the word file straight from memory
             row = int(i / 2)
             if i % 2 == 0:
                 cell = self.doc.tables[0].cell(row + 1, 1)
             else:
                 cell = self.doc.tables[1].cell(row + 1, 1)
-            cell.add_paragraph().add_run().add_picture(TMP_FILE_PATH, width=Inches(width), height=Inches(height))
-            cell.paragraphs[1].alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+            add_picture(cell, hists[i], width=Inches(width), height=Inches(height))
 
-            # remove png as it is no longer needed
-            os.remove(TMP_FILE_PATH)
-
-        # avoiding corrupting the word file
-        # the id gets mixed with some of the things of the template file
-        # for further reading - https://github.com/python-openxml/python-docx/issues/455
-        # or need version better than 0.8.7
-        try:
-            docPrs = self.doc._part._element.findall('.//' + qn('wp:docPr'))
-            for docPr in docPrs:
-                docPr.set('id', str(int(docPr.get('id')) + 100000))
-        except:
-            pass
+        fix_picture_ids(self.doc)
 
     def add_histograms_to_table(self, hists, table_num, width=6.6, height=2.2):
         """
@@ -69,33 +54,16 @@ class DocxHelper:
         :return:
         """
         for i in range(int(len(hists))):
-            # save the hist as png, so we can load to word as a picture
-            cur_hist = hists[i]
-            TMP_FILE_PATH = "tmp.png"
-            with open(TMP_FILE_PATH, 'wb') as f:
-                f.write(cur_hist)
+            # the histograms are png bytes, added to the word file straight from memory
             try:
                 cell = self.doc.tables[table_num].cell(i + 1, 1)
             except:
                 print(f"table {table_num} does not have enough rows")
                 print(f"failed at i={i}")
                 break
-            cell.add_paragraph().add_run().add_picture(TMP_FILE_PATH, width=Inches(width), height=Inches(height))
-            cell.paragraphs[1].alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-
-            # remove png as it is no longer needed
-            os.remove(TMP_FILE_PATH)
+            add_picture(cell, hists[i], width=Inches(width), height=Inches(height))
 
-        # avoiding corrupting the word file
-        # the id gets mixed with some of the things of the template file
-        # for further reading - https://github.com/python-openxml/python-docx/issues/455
-        # or need version better than 0.8.7
-        try:
-            docPrs = self.doc._part._element.findall('.//' + qn('wp:docPr'))
-            for docPr in docPrs:
-                docPr.set('id', str(int(docPr.get('id')) + 100000))
-        except:
-            pass
+        fix_picture_ids(self.doc)
 
     def save(self, path: str):
         self.doc.save(path)
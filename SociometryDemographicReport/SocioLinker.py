@@ -1,23 +1,29 @@
 import os
+import sys
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
+# the modules shared with the other packages are in shared/ in the root of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.tables import load_table
+
+
 class SocioLinker:
     def __init__(self, sociometric_path: str, sociogram_path: str, sociogram_name_column: int):
         """
-        :param sociometric_path: path to the stats.xlsx file of the sociometric data
+        :param sociometric_path: path to the stats.xlsx file of the sociometric data (or to its .pkl intermediate)
         :param sociogram_path: path to the sociogram excel file
         :param sociogram_name_column: the column number of the names in the sociogram file
         :param last_year_socio_path: path to the last year sociogram excel file
         """
         # load the stats.xlsx file of the sociometric data
         print(f"loading sociometric data from {sociometric_path}")
-        self.sociometric_df = pd.read_excel(sociometric_path)
+        self.sociometric_df = load_table(sociometric_path)
 
         # assume that the combined_data.xlsx is in the same folder as the sociometric data
-        self.combined_data_df = pd.read_excel(os.path.join(os.path.dirname(sociometric_path), "combined_data.xlsx"))
+        self.combined_data_df = load_table(os.path.join(os.path.dirname(sociometric_path), "combined_data.xlsx"))
         # drop all rows with name == "ממוצע"
         self.combined_data_df = self.combined_data_df[self.combined_data_df['name'] != "ממוצע"]
         # drop the "points to conserve" and "points to improve" columns
@@ -0,0 +1,50 @@
+from io import BytesIO
+
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.oxml.ns import qn
+
+
+def image_stream(image):
+    """
+    Render an image into an in-memory png, ready to be added to a word file.
+    :param image: matplotlib figure, png bytes or a stream of a png
+    :return: BytesIO positioned at the start of the png
+    """
+    if isinstance(image, (bytes, bytearray)):
+        return BytesIO(image)
+
+    if hasattr(image, "savefig"):
+        stream = BytesIO()
+        image.savefig(stream, format="png")
+        stream.seek(0)
+        return stream
+
+    image.seek(0)
+    return image
+
+
+def add_picture(cell, image, alignment=WD_PARAGRAPH_ALIGNMENT.CENTER, **size):
+    """
+    Add the image as a picture in a new paragraph of a table cell, without saving it to the disk.
+    :param cell: the table cell
+    :param image: matplotlib figure, png bytes or a stream of a png
+    :param size: width / height of the picture (docx.shared lengths)
+    :return: the new paragraph
+    """
+    paragraph = cell.add_paragraph()
+    paragraph.add_run().add_picture(image_stream(image), **size)
+    paragraph.alignment = alignment
+    return paragraph
+
+
+def fix_picture_ids(doc):
+    # avoiding corrupting the word file
+    # the id gets mixed with some of the things of the template file
+    # for further reading - https://github.com/python-openxml/python-docx/issues/455
+    # or need version better than 0.8.7
+    try:
+        docPrs = doc._part._element.findall('.//' + qn('wp:docPr'))
+        for docPr in docPrs:
+            docPr.set('id', str(int(docPr.get('id')) + 100000))
+    except:
+        pass
@@ -0,0 +1,22 @@
+import os
+
+import pandas as pd
+
+# the intermediate tables are saved as pickles, they keep the dtypes (also of mixed columns) and load fast.
+# the excel files with the same name are only exported for humans to read.
+INTERMEDIATE_EXTENSION = ".pkl"
+
+
+def load_table(path):
+    """
+    Load a table saved by the sociometry pipeline, prefer the intermediate next to the excel file when it exists.
+    if the excel was edited by hand after the intermediate was saved, the excel is loaded instead.
+    :param path: path to the excel (or the intermediate) file
+    :return: the loaded dataframe
+    """
+    intermediate_path = os.path.splitext(path)[0] + INTERMEDIATE_EXTENSION
+    if os.path.isfile(intermediate_path):
+        if path == intermediate_path or not os.path.isfile(path) or \
+                os.path.getmtime(intermediate_path) >= os.path.getmtime(path):
+            return pd.read_pickle(intermediate_path)
+    return pd.read_excel(path, header=0, engine='openpyxl')